@@ -0,0 +1,115 @@
+"""
+Standard benchmark cases of the obj modules (see obj/benchmark.py):
+- nc: nc_function_args/nc_function_dict, stepper against the other root finders, on the notebook test functions
+- calc_h: calc_h one point at a time against calc_h_batch
+- table: build_table and build_table_columns on growing sizes
+- ivp: ivp_batch on a batch of members against one integration for each member
+
+    python bench/bench_cases.py [--groups nc table] [--filter .brent] [--repeat 7] [--tolerance 1.2] [--save]
+
+The results are compared with the stored baseline (if existing): exit code 1 when a regression is flagged.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from obj.benchmark import run_suite, save_results, load_results, compare, report
+
+BASELINE = os.path.join(ROOT, 'bench', 'baselines', 'cases.json')
+
+"notebook test functions (dev/dev_numerical-convergence.ipynb): settings, function, args, derivative"
+NC_FUNCTIONS = {
+    'incr': ({'y_t': 4.5}, lambda x: x**2, (), lambda x: 2 * x),
+    'decr': ({'y_t': -50, 'trend': False}, lambda x: - x**2, (), lambda x: - 2 * x),
+    'incr_args': ({'y_t': 50, 'trend': True}, lambda x, x1, x2: x**2 + x1 + 3 * x2, (2, 3), lambda x, x1, x2: 2 * x),
+    'decr_args': ({'y_t': -500, 'trend': False}, lambda x, x1, x2: - x**2 - x1 - 3 * x2, (2, 3), lambda x, x1, x2: - 2 * x),
+}
+
+def _function_dict(inp_dict:dict) -> dict:
+    x = inp_dict.get('x')
+    z = inp_dict.get('z', 0)
+    return {'sum': x - z, 'prod': x * z}
+
+def nc_cases() -> dict:
+    from obj.numerical_convergence import nc_function_args, nc_function_dict, NC_METHODS
+    base = {'tol': 0.005, 'delta': 5, 'delta_scaler': 2, 'x_0': 100, 'x_min': None, 'x_max': None, 'result': True}
+    info = lambda r: {'evaluations': r.evaluations, 'conv': r.conv}
+    cases = {}
+    for name, (settings, function, args, derivative) in NC_FUNCTIONS.items():
+        for method in NC_METHODS:
+            s = {**base, **settings, 'method': method}
+            if method == 'newton':
+                s['derivative'] = derivative
+            cases[f"nc.{name}.{method}"] = {'function': nc_function_args, 'args': (s, function, *args),
+                                            'number': 20, 'info': info}
+    for method in NC_METHODS:
+        s = {**base, 'x_name': 'x', 'y_t_name': 'sum', 'y_t': 50, 'trend': True, 'method': method}
+        if method == 'newton':
+            s['derivative'] = lambda inp_dict: 1.
+        cases[f"nc.dict.{method}"] = {'function': nc_function_dict, 'setup': lambda s=s: (s, _function_dict, {'x': 12, 'z': 3}),
+                                      'number': 20, 'info': info}
+    return cases
+
+def calc_h_cases(n:int=1000) -> dict:
+    import numpy as np
+    from obj.coolprop_utils import calc_h, calc_h_batch
+    p = np.linspace(1, 10, n) # barg
+    t = np.linspace(20, 60, n) # degC
+    points = [[p_i, t_i] for p_i, t_i in zip(p.tolist(), t.tolist())]
+    single = lambda: [calc_h(list(point), 'R134a') for point in points]
+    batch = lambda: calc_h_batch(p, t, np.full(n, np.nan), 'R134a')
+    return {f"calc_h.single.{n}": {'function': single, 'repeat': 5},
+            f"calc_h.batch.{n}": {'function': batch, 'repeat': 5}}
+
+def table_cases(sizes:list[int]=[100, 1000, 10000, 100000]) -> dict:
+    import numpy as np
+    from obj.table_printout import build_table, build_table_columns
+    cases = {}
+    for n in sizes:
+        columns = {'i': np.arange(n), 'p': np.linspace(1, 30, n), 'h': np.linspace(2e5, 4.5e5, n), 'x': np.linspace(0, 1, n)}
+        records = [list(rec) for rec in zip(*[c.tolist() for c in columns.values()])]
+        number = max(1, 1000 // n)
+        cases[f"table.records.{n}"] = {'function': build_table, 'args': (list(columns), records, {}), 'number': number}
+        cases[f"table.columns.{n}"] = {'function': build_table_columns, 'args': (columns, {}), 'number': number}
+    return cases
+
+def ivp_cases(m:int=200) -> dict:
+    import numpy as np
+    from obj.NumericalSolver.InitialValues.initial_values import ivp_batch
+    w = np.linspace(1, 3, m) # oscillators, angular frequency of each member
+    function = lambda t, y, w: np.stack([y[:, 1], - w**2 * y[:, 0]], axis=1)
+    y_0 = np.tile([1., 0.], (m, 1))
+    settings = {'t_end': 10, 'rtol': 1e-6}
+    info = lambda r: {'nfev': int(r.nfev.sum())}
+    loop = lambda: [ivp_batch(settings, function, y_0[i:i + 1], w[i:i + 1]) for i in range(m)]
+    return {f"ivp.batch.{m}": {'function': ivp_batch, 'args': (settings, function, y_0, w), 'info': info},
+            f"ivp.loop.{m}": {'function': loop, 'warmup': 0, 'repeat': 3}}
+
+CASES = {'nc': nc_cases, 'calc_h': calc_h_cases, 'table': table_cases, 'ivp': ivp_cases}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cases of the obj modules")
+    parser.add_argument('--groups', nargs='+', default=list(CASES), choices=list(CASES), help="case groups")
+    parser.add_argument('--filter', default=None, help="only the cases with the name containing the string")
+    parser.add_argument('--warmup', type=int, default=1, help="runs not measured")
+    parser.add_argument('--repeat', type=int, default=7, help="measured runs")
+    parser.add_argument('--tolerance', type=float, default=1.2, help="allowed ratio against the baseline")
+    parser.add_argument('--save', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--baseline', default=BASELINE, help="baseline file (json)")
+    args = parser.parse_args()
+
+    cases = {}
+    for group in args.groups:
+        cases.update(CASES[group]())
+    results = run_suite(cases, {'warmup': args.warmup, 'repeat': args.repeat, 'filter': args.filter})
+    comparison = None
+    if os.path.exists(args.baseline):
+        comparison = compare(results, load_results(args.baseline), args.tolerance)
+    print(report(results, comparison).table)
+    if args.save:
+        baseline = load_results(args.baseline) if os.path.exists(args.baseline) else {}
+        save_results({**baseline, **results}, args.baseline) # cases not run are kept
+    sys.exit(1 if comparison and any(c['regression'] for c in comparison.values()) else 0)
@@ -0,0 +1,98 @@
+"""
+Startup time of the obj modules, measured in fresh interpreters (as short-lived worker processes).
+For each target the import time (measured inside the interpreter) is the median over the runs.
+Regression checks:
+- heavy modules (CoolProp, matplotlib) loaded by a target that must not load them, always an error
+- import time above the stored baseline times the tolerance (baseline saved with --save)
+
+    python bench/bench_startup.py [--runs 7] [--tolerance 1.5] [--save]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, 'bench', 'baselines', 'startup.json')
+
+"target: (import statement, heavy modules that must not be loaded)"
+TARGETS = {
+    'obj': ("import obj", ['numpy', 'CoolProp', 'matplotlib']),
+    'obj.numerical_convergence': ("import obj.numerical_convergence", ['numpy', 'CoolProp', 'matplotlib', 'asyncio']),
+    'obj.table_printout': ("import obj.table_printout", ['numpy', 'CoolProp', 'matplotlib']),
+    'obj.coolprop_utils': ("import obj.coolprop_utils", ['numpy', 'CoolProp', 'matplotlib']),
+    'from obj import nc_function_dict': ("from obj import nc_function_dict", ['numpy', 'CoolProp', 'matplotlib']),
+}
+
+_PROBE = """
+import sys, json
+from time import perf_counter_ns
+t0 = perf_counter_ns()
+{statement}
+t1 = perf_counter_ns()
+print(json.dumps({{'time': (t1 - t0) * 1e-9, 'modules': [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+def _run(code:str) -> dict:
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def measure(runs:int=7) -> dict:
+    """
+    Import time of each target in fresh interpreters.
+    - runs: int, default=7, number of interpreters started for each target
+    Return
+    - results: dict, {target: {'time': median import time [s], 'min': [s], 'modules': heavy modules loaded}}
+    """
+    results = {}
+    for target, (statement, heavy) in TARGETS.items():
+        samples = [_run(_PROBE.format(statement=statement, heavy=heavy)) for _ in range(runs)]
+        times = [s['time'] for s in samples]
+        results[target] = {'time': median(times), 'min': min(times), 'modules': samples[-1]['modules']}
+    return results
+
+def check(results:dict, baseline:dict=None, tolerance:float=1.5) -> list:
+    """
+    Regressions of the measured results.
+    - results: dict, see measure
+    - baseline: dict, default=None, results previously saved, time check skipped if None
+    - tolerance: float, default=1.5, allowed ratio between the measured and the baseline times
+    Return
+    - errors: list[str], empty if no regression is found
+    """
+    errors = []
+    for target, res in results.items():
+        if res['modules']:
+            errors.append(f"{target}: heavy modules loaded at import {res['modules']}")
+        if baseline and target in baseline:
+            limit = baseline[target]['time'] * tolerance
+            if res['time'] > limit:
+                errors.append(f"{target}: {res['time']*1e3:.1f} ms > {limit*1e3:.1f} ms "
+                              f"(baseline {baseline[target]['time']*1e3:.1f} ms x {tolerance})")
+    return errors
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time benchmark of the obj modules")
+    parser.add_argument('--runs', type=int, default=7, help="interpreters started for each target")
+    parser.add_argument('--tolerance', type=float, default=1.5, help="allowed ratio against the baseline")
+    parser.add_argument('--save', action='store_true', help="store the results as the new baseline")
+    parser.add_argument('--baseline', default=BASELINE, help="baseline file (json)")
+    args = parser.parse_args()
+
+    results = measure(args.runs)
+    for target, res in results.items():
+        print(f"{target:<35} {res['time']*1e3:8.1f} ms (min {res['min']*1e3:.1f} ms)")
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    errors = check(results, baseline, args.tolerance)
+    for e in errors:
+        print("REGRESSION", e)
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,269 @@
+import numpy as np
+from bisect import bisect_right
+from obj.EquationSystems.LinearEquations.linear_equations import TridiagonalFactor
+
+INTERP_1D_METHODS = ['linear', 'pchip', 'cubic']
+INTERP_2D_METHODS = ['bilinear', 'bicubic']
+
+
+def _check_grid(x, name='x'):
+    "strictly increasing grid of at least 2 points"
+    x = np.asarray(x, dtype=float).ravel()
+    if x.size < 2:
+        raise ValueError(f"Grid '{name}' needs at least 2 points: {x.size}")
+    if not np.all(np.diff(x) > 0):
+        raise ValueError(f"Grid '{name}' is not strictly increasing")
+    return x
+
+def _hint_search(xs:list, v:float, k:int) -> int:
+    """
+    Interval index of v into the grid xs (list), starting from the hint k (last interval found):
+    the hint and its neighbours are checked first, then a binary search is done.
+    Values outside the grid are assigned to the first/last interval.
+    """
+    n = len(xs) - 2 # last interval index
+    if xs[k] <= v:
+        if v < xs[k + 1] or k == n:
+            return k
+        if k + 1 == n or v < xs[k + 2]:
+            return k + 1
+    elif k == 0:
+        return 0
+    elif xs[k - 1] <= v or k == 1:
+        return k - 1
+    k = bisect_right(xs, v) - 1
+    return 0 if k < 0 else n if k > n else k
+
+def _intervals(grid, v):
+    "vectorized interval indexes of v into the grid (outside values to the first/last interval)"
+    return np.clip(np.searchsorted(grid, v, side='right') - 1, 0, grid.size - 2)
+
+def _pchip_slopes(h, delta):
+    """
+    Fritsch-Carlson monotone slopes (weighted harmonic mean, one-sided three-point end slopes).
+    - h: array, interval widths
+    - delta: array, interval secant slopes (first axis along the intervals)
+    """
+    n = h.size + 1
+    d = np.zeros((n,) + delta.shape[1:])
+    if n == 2:
+        d[:] = delta[0]
+        return d
+    hs = h.reshape((-1,) + (1,) * (delta.ndim - 1))
+    w1 = 2 * hs[1:] + hs[:-1]
+    w2 = hs[1:] + 2 * hs[:-1]
+    same_sign = (np.sign(delta[:-1]) * np.sign(delta[1:])) > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        harmonic = (w1 + w2) / (w1 / delta[:-1] + w2 / delta[1:])
+    d[1:-1] = np.where(same_sign, harmonic, 0.)
+
+    def end_slope(h0, h1, m0, m1):
+        s = ((2 * h0 + h1) * m0 - h0 * m1) / (h0 + h1)
+        s = np.where(np.sign(s) != np.sign(m0), 0., s)
+        return np.where((np.sign(m0) != np.sign(m1)) & (np.abs(s) > np.abs(3 * m0)), 3 * m0, s)
+    d[0] = end_slope(h[0], h[1], delta[0], delta[1])
+    d[-1] = end_slope(h[-1], h[-2], delta[-1], delta[-2])
+    return d
+
+def _spline_slopes(h, delta):
+    """
+    Natural cubic spline slopes (zero second derivative at the ends), tridiagonal system solved by the
+    Thomas algorithm.
+    - h: array, interval widths
+    - delta: array, interval secant slopes (first axis along the intervals)
+    """
+    n = h.size + 1
+    hs = h.reshape((-1,) + (1,) * (delta.ndim - 1))
+    "tridiagonal system of the slopes: sub a, diagonal b, super c, rhs r"
+    a = np.zeros(n); b = np.zeros(n); c = np.zeros(n)
+    r = np.zeros((n,) + delta.shape[1:])
+    b[0], c[0], r[0] = 2 * h[0], h[0], 3 * h[0] * delta[0]
+    b[-1], a[-1], r[-1] = 2 * h[-1], h[-1], 3 * h[-1] * delta[-1]
+    a[1:-1], c[1:-1] = h[1:], h[:-1]
+    b[1:-1] = 2 * (h[:-1] + h[1:])
+    r[1:-1] = 3 * (hs[1:] * delta[:-1] + hs[:-1] * delta[1:])
+    return TridiagonalFactor(a, b, c).solve(r)
+
+class Interp1D:
+    def __init__(self, x, y, method:str='linear', extrapolate:bool=True):
+        """
+        1D interpolation table, piecewise cubic coefficients precomputed once:
+        y = c0 + c1*dx + c2*dx^2 + c3*dx^3, with dx = x - x_k in the interval k.
+        - x: array-like, strictly increasing grid
+        - y: array-like, values with shape (n,) or (n, m) (m curves sharing the same grid)
+        - method: str, default='linear'
+            - 'linear': piecewise linear
+            - 'pchip': monotone piecewise cubic Hermite (Fritsch-Carlson), no overshoot
+            - 'cubic': natural cubic spline, continuous second derivative
+        - extrapolate: bool, default=True, end polynomials used outside the grid, NaN otherwise
+        Usage:
+        - table(x_q): vectorized query
+        - table.at(x_q): scalar query with last-interval hint (fast for sequences of close queries)
+        """
+        if method not in INTERP_1D_METHODS:
+            raise ValueError(f"Method '{method}' not available, allowed methods: {INTERP_1D_METHODS}")
+        self.x = _check_grid(x)
+        self.y = np.asarray(y, dtype=float)
+        if self.y.shape[0] != self.x.size:
+            raise ValueError(f"x and y are not the same length: {self.x.size} != {self.y.shape[0]}")
+        self.method = method
+        self.extrapolate = extrapolate
+        h = np.diff(self.x)
+        hs = h.reshape((-1,) + (1,) * (self.y.ndim - 1))
+        delta = np.diff(self.y, axis=0) / hs
+        coef = np.zeros((4,) + delta.shape)
+        coef[0] = self.y[:-1]
+        if method == 'linear':
+            coef[1] = delta
+        else:
+            d = _pchip_slopes(h, delta) if method == 'pchip' else _spline_slopes(h, delta)
+            coef[1] = d[:-1]
+            coef[2] = (3 * delta - 2 * d[:-1] - d[1:]) / hs
+            coef[3] = (d[:-1] + d[1:] - 2 * delta) / hs**2
+        self.coef = coef
+        "scalar path: python lists, no numpy overhead for each call"
+        self._xs = self.x.tolist()
+        self._coef = [tuple(c) for c in np.moveaxis(coef, 0, 1).tolist()]
+        self._k = 0
+
+    def __call__(self, x_q):
+        """
+        Vectorized query.
+        - x_q: array-like, query points
+        Return
+        - y_q: array, shape of x_q (plus the curves axis if y is 2D)
+        """
+        x_q = np.asarray(x_q, dtype=float)
+        k = _intervals(self.x, x_q)
+        dx = x_q - self.x[k]
+        if self.y.ndim > 1:
+            dx = dx[..., None]
+        c = self.coef[:, k]
+        y_q = c[0] + dx * (c[1] + dx * (c[2] + dx * c[3]))
+        if not self.extrapolate:
+            out = (x_q < self.x[0]) | (x_q > self.x[-1])
+            y_q = np.where(out[..., None] if self.y.ndim > 1 else out, np.nan, y_q)
+        return y_q
+
+    def at(self, x_q:float):
+        """
+        Scalar query with last-interval hint: nearly monotonic sequences of queries (e.g. inside a
+        convergence loop) find the interval in O(1) instead of a binary search.
+        - x_q: float, query point
+        Return
+        - y_q: float (list[float] if y is 2D)
+        """
+        xs = self._xs
+        if not self.extrapolate and not xs[0] <= x_q <= xs[-1]:
+            return float('nan') if self.y.ndim == 1 else [float('nan')] * self.y.shape[1]
+        k = self._k = _hint_search(xs, x_q, self._k)
+        dx = x_q - xs[k]
+        c0, c1, c2, c3 = self._coef[k]
+        if self.y.ndim == 1:
+            return c0 + dx * (c1 + dx * (c2 + dx * c3))
+        return [a + dx * (b + dx * (c + dx * d)) for a, b, c, d in zip(c0, c1, c2, c3)]
+
+def _bicubic_matrix():
+    "Hermite basis matrix: p(t) = [1, t, t^2, t^3] . M . [f(0), f(1), f'(0), f'(1)]"
+    return np.array([[1., 0., 0., 0.], [0., 0., 1., 0.], [-3., 3., -2., -1.], [2., -2., 1., 1.]])
+
+class Interp2D:
+    def __init__(self, x, y, z, method:str='bilinear', extrapolate:bool=True):
+        """
+        2D interpolation table on a regular (rectilinear) grid, cell coefficients precomputed once:
+        z = sum_ij a_ij * t^i * u^j, with t, u the normalized coordinates into the cell.
+        - x: array-like, strictly increasing grid of the first input (nx)
+        - y: array-like, strictly increasing grid of the second input (ny)
+        - z: array-like, values with shape (nx, ny)
+        - method: str, default='bilinear'
+            - 'bilinear': bilinear interpolation of the 4 cell corners
+            - 'bicubic': bicubic Hermite patches, derivatives by finite differences (continuous first derivatives)
+        - extrapolate: bool, default=True, boundary cells used outside the grid, NaN otherwise
+        Usage:
+        - table(x_q, y_q): vectorized query (broadcast)
+        - table.at(x_q, y_q): scalar query with last-cell hint
+        """
+        if method not in INTERP_2D_METHODS:
+            raise ValueError(f"Method '{method}' not available, allowed methods: {INTERP_2D_METHODS}")
+        self.x = _check_grid(x, 'x')
+        self.y = _check_grid(y, 'y')
+        self.z = np.asarray(z, dtype=float)
+        if self.z.shape != (self.x.size, self.y.size):
+            raise ValueError(f"z shape {self.z.shape} is not consistent with the grid ({self.x.size}, {self.y.size})")
+        self.method = method
+        self.extrapolate = extrapolate
+        hx, hy = np.diff(self.x)[:, None], np.diff(self.y)[None, :]
+        z = self.z
+        f00, f10, f01, f11 = z[:-1, :-1], z[1:, :-1], z[:-1, 1:], z[1:, 1:]
+        n = 4 if method == 'bicubic' else 2
+        coef = np.zeros((self.x.size - 1, self.y.size - 1, n, n))
+        if method == 'bilinear':
+            coef[..., 0, 0] = f00
+            coef[..., 1, 0] = f10 - f00
+            coef[..., 0, 1] = f01 - f00
+            coef[..., 1, 1] = f11 - f10 - f01 + f00
+        else:
+            zx = np.gradient(z, self.x, axis=0) if self.x.size > 2 else np.repeat(np.diff(z, axis=0) / np.diff(self.x)[0], 2, axis=0)
+            zy = np.gradient(z, self.y, axis=1) if self.y.size > 2 else np.repeat(np.diff(z, axis=1) / np.diff(self.y)[0], 2, axis=1)
+            zxy = np.gradient(zx, self.y, axis=1) if self.y.size > 2 else np.repeat(np.diff(zx, axis=1) / np.diff(self.y)[0], 2, axis=1)
+            "cell values and derivatives scaled to the normalized coordinates"
+            F = np.empty(coef.shape)
+            F[..., 0, 0], F[..., 0, 1], F[..., 1, 0], F[..., 1, 1] = f00, f01, f10, f11
+            F[..., 0, 2], F[..., 0, 3] = zy[:-1, :-1] * hy, zy[:-1, 1:] * hy
+            F[..., 1, 2], F[..., 1, 3] = zy[1:, :-1] * hy, zy[1:, 1:] * hy
+            F[..., 2, 0], F[..., 2, 1] = zx[:-1, :-1] * hx, zx[:-1, 1:] * hx
+            F[..., 3, 0], F[..., 3, 1] = zx[1:, :-1] * hx, zx[1:, 1:] * hx
+            F[..., 2, 2], F[..., 2, 3] = zxy[:-1, :-1] * hx * hy, zxy[:-1, 1:] * hx * hy
+            F[..., 3, 2], F[..., 3, 3] = zxy[1:, :-1] * hx * hy, zxy[1:, 1:] * hx * hy
+            M = _bicubic_matrix()
+            coef = np.einsum('ik,...kl,jl->...ij', M, F, M)
+        self.coef = coef
+        self._xs, self._ys = self.x.tolist(), self.y.tolist()
+        self._coef = coef.tolist()
+        self._k = [0, 0]
+
+    def __call__(self, x_q, y_q):
+        """
+        Vectorized query (x_q and y_q broadcast together).
+        - x_q, y_q: array-like, query points
+        Return
+        - z_q: array
+        """
+        x_q, y_q = np.broadcast_arrays(np.asarray(x_q, dtype=float), np.asarray(y_q, dtype=float))
+        i, j = _intervals(self.x, x_q), _intervals(self.y, y_q)
+        t = (x_q - self.x[i]) / (self.x[i + 1] - self.x[i])
+        u = (y_q - self.y[j]) / (self.y[j + 1] - self.y[j])
+        a = self.coef[i, j]
+        n = a.shape[-1]
+        z_q = np.zeros(x_q.shape)
+        for p in range(n - 1, -1, -1):
+            row = a[..., p, n - 1]
+            for q in range(n - 2, -1, -1):
+                row = row * u + a[..., p, q]
+            z_q = z_q * t + row
+        if not self.extrapolate:
+            out = (x_q < self.x[0]) | (x_q > self.x[-1]) | (y_q < self.y[0]) | (y_q > self.y[-1])
+            z_q = np.where(out, np.nan, z_q)
+        return z_q
+
+    def at(self, x_q:float, y_q:float) -> float:
+        """
+        Scalar query with last-cell hint (see Interp1D.at).
+        - x_q, y_q: float, query point
+        Return
+        - z_q: float
+        """
+        xs, ys = self._xs, self._ys
+        if not self.extrapolate and not (xs[0] <= x_q <= xs[-1] and ys[0] <= y_q <= ys[-1]):
+            return float('nan')
+        i = self._k[0] = _hint_search(xs, x_q, self._k[0])
+        j = self._k[1] = _hint_search(ys, y_q, self._k[1])
+        t = (x_q - xs[i]) / (xs[i + 1] - xs[i])
+        u = (y_q - ys[j]) / (ys[j + 1] - ys[j])
+        z_q = 0.
+        for row in reversed(self._coef[i][j]):
+            r = 0.
+            for a in reversed(row):
+                r = r * u + a
+            z_q = z_q * t + r
+        return z_q
@@ -0,0 +1,313 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+"""
+Factorizations of the coefficient matrix computed once and reused for any number of right-hand sides:
+- LUFactor: dense matrix, LU with partial pivoting, O(n^3) once then O(n^2) for each right-hand side
+- TridiagonalFactor: tridiagonal matrix, Thomas algorithm, O(n) once then O(n) for each right-hand side
+- BandedFactor: banded matrix, LU with partial pivoting in band storage, O(n*l*(l+u)) once then O(n*(2*l+u))
+The right-hand sides are solved together when given as the columns of a 2D array (one loop for all of them).
+"""
+
+def _rhs(b, n):
+    "right-hand side as float array with n rows (copy)"
+    b = np.array(b, dtype=float)
+    if b.shape[0] != n:
+        raise ValueError(f"right-hand side with {b.shape[0]} rows, {n} expected")
+    return b
+
+def _singular(k):
+    return np.linalg.LinAlgError(f"singular matrix: zero pivot at row {k}")
+
+class _Factorization(ABC):
+    n = 0
+    norm1 = 0.
+
+    @abstractmethod
+    def solve(self, b, trans:bool=False):
+        "Solution of A x = b (A^T x = b if trans), b a vector or the right-hand sides as columns."
+
+    def cond_est(self, itmax:int=5) -> float:
+        """
+        1-norm condition number estimate, cond_1(A) = ||A||_1 ||A^-1||_1, without computing the inverse:
+        ||A^-1||_1 is estimated by the Hager algorithm (Higham refinement), a few solves with A and A^T.
+        - itmax: int, default=5, maximum number of iterations
+        Return
+        - cond: float, lower bound of cond_1(A), usually within a factor 3 (inf if singular)
+        """
+        n = self.n
+        x = np.full(n, 1. / n)
+        est = 0.
+        j_old = -1
+        for _ in range(itmax):
+            y = self.solve(x)
+            est = np.abs(y).sum()
+            z = self.solve(np.where(y >= 0, 1., -1.), trans=True)
+            j = int(np.argmax(np.abs(z)))
+            if abs(z[j]) <= z @ x or j == j_old:
+                break
+            x = np.zeros(n)
+            x[j] = 1.
+            j_old = j
+        "alternating sign vector: catches the cases where the iterations stop at a local maximum"
+        alt = (-1.) ** np.arange(n) * (1 + np.arange(n) / max(n - 1, 1))
+        est = max(est, 2 * np.abs(self.solve(alt)).sum() / (3 * n))
+        return self.norm1 * est
+
+class LUFactor(_Factorization):
+    def __init__(self, A, block:int=64):
+        """
+        LU factorization with partial pivoting of a dense square matrix, P A = L U
+        (L unit lower triangular and U upper triangular stored together in lu).
+        - A: array-like, square coefficient matrix (n, n)
+        - block: int, default=64, panel width of the blocked elimination
+        Raise
+        - numpy.linalg.LinAlgError: singular matrix
+        Usage:
+        - lu = LUFactor(A); x = lu.solve(b): b with shape (n,) or (n, m), m right-hand sides solved together
+        """
+        lu = np.array(A, dtype=float)
+        if lu.ndim != 2 or lu.shape[0] != lu.shape[1]:
+            raise ValueError(f"square matrix expected, shape {lu.shape}")
+        n = self.n = lu.shape[0]
+        self.norm1 = np.abs(lu).sum(axis=0).max() if n else 0.
+        perm = np.arange(n)
+        sign = 1.
+        "blocked right-looking elimination: rank-1 updates within a panel, matrix products for the trailing matrix"
+        for k0 in range(0, n, block):
+            k1 = min(k0 + block, n)
+            for k in range(k0, k1):
+                p = k + int(np.argmax(np.abs(lu[k:, k])))
+                if lu[p, k] == 0:
+                    raise _singular(k)
+                if p != k:
+                    lu[[k, p]] = lu[[p, k]]
+                    perm[[k, p]] = perm[[p, k]]
+                    sign = -sign
+                lu[k + 1:, k] /= lu[k, k]
+                lu[k + 1:, k + 1:k1] -= np.outer(lu[k + 1:, k], lu[k, k + 1:k1])
+            if k1 < n:
+                L11 = np.tril(lu[k0:k1, k0:k1], -1) + np.eye(k1 - k0)
+                lu[k0:k1, k1:] = np.linalg.solve(L11, lu[k0:k1, k1:])
+                lu[k1:, k1:] -= lu[k1:, k0:k1] @ lu[k0:k1, k1:]
+        self.lu = lu
+        self.perm = perm
+        self._sign = sign
+
+    def solve(self, b, trans:bool=False):
+        """
+        Solution of A x = b (or A^T x = b), forward and backward substitutions, O(n^2) for each right-hand side.
+        - b: array-like, right-hand side (n,) or right-hand sides as columns (n, m)
+        - trans: bool, default=False, the transposed system A^T x = b is solved
+        Return
+        - x: array, shape of b
+        """
+        lu, n = self.lu, self.n
+        b = _rhs(b, n)
+        if not trans:
+            y = b[self.perm]
+            for i in range(1, n):
+                y[i] -= lu[i, :i] @ y[:i]
+            for i in range(n - 1, -1, -1):
+                y[i] = (y[i] - lu[i, i + 1:] @ y[i + 1:]) / lu[i, i]
+            return y
+        "A^T = U^T L^T P: U^T y = b, L^T z = y, x = P^T z"
+        y = b
+        for i in range(n):
+            y[i] = (y[i] - lu[:i, i] @ y[:i]) / lu[i, i]
+        for i in range(n - 2, -1, -1):
+            y[i] -= lu[i + 1:, i] @ y[i + 1:]
+        x = np.empty_like(y)
+        x[self.perm] = y
+        return x
+
+    def det(self) -> float:
+        "Determinant, product of the pivots."
+        return self._sign * np.prod(np.diag(self.lu))
+
+class TridiagonalFactor(_Factorization):
+    def __init__(self, a, b, c):
+        """
+        Thomas algorithm factorization of a tridiagonal matrix (no pivoting: the matrix should be diagonally
+        dominant or symmetric positive definite, otherwise use BandedFactor with l=u=1).
+        - a: array-like, sub-diagonal, n values (a[0] not used) or n-1 values
+        - b: array-like, diagonal, n values
+        - c: array-like, super-diagonal, n values (c[-1] not used) or n-1 values
+        Raise
+        - numpy.linalg.LinAlgError: zero pivot
+        Usage:
+        - tri = TridiagonalFactor(a, b, c); x = tri.solve(d): d with shape (n,) or (n, m)
+        """
+        b = np.array(b, dtype=float)
+        n = self.n = b.size
+        a = np.asarray(a, dtype=float)
+        c = np.asarray(c, dtype=float)
+        a = np.concatenate([[0.], a]) if a.size == n - 1 else a.copy()
+        c = np.concatenate([c, [0.]]) if c.size == n - 1 else c.copy()
+        a[0] = c[-1] = 0.
+        col = np.abs(b)
+        col[1:] += np.abs(c[:-1])
+        col[:-1] += np.abs(a[1:])
+        self.norm1 = col.max() if n else 0.
+        "A = L U, L unit lower bidiagonal (multipliers m), U upper bidiagonal (pivots d, super-diagonal c)"
+        m = np.zeros(n)
+        d = b
+        for i in range(1, n):
+            if d[i - 1] == 0:
+                raise _singular(i - 1)
+            m[i] = a[i] / d[i - 1]
+            d[i] -= m[i] * c[i - 1]
+        if n and d[-1] == 0:
+            raise _singular(n - 1)
+        self._m = m.tolist()
+        self._d = d.tolist()
+        self._c = c.tolist()
+
+    def solve(self, d, trans:bool=False):
+        """
+        Solution of A x = d (or A^T x = d), O(n) for each right-hand side.
+        - d: array-like, right-hand side (n,) or right-hand sides as columns (n, m)
+        - trans: bool, default=False, the transposed system A^T x = d is solved
+        Return
+        - x: array, shape of d
+        """
+        m, p, c, n = self._m, self._d, self._c, self.n
+        x = _rhs(d, n)
+        if x.ndim == 1:
+            "python floats: faster than numpy scalars element by element"
+            x = x.tolist()
+        if not trans:
+            for i in range(1, n):
+                x[i] = x[i] - m[i] * x[i - 1]
+            x[n - 1] = x[n - 1] / p[n - 1]
+            for i in range(n - 2, -1, -1):
+                x[i] = (x[i] - c[i] * x[i + 1]) / p[i]
+        else:
+            "A^T = U^T L^T"
+            x[0] = x[0] / p[0]
+            for i in range(1, n):
+                x[i] = (x[i] - c[i - 1] * x[i - 1]) / p[i]
+            for i in range(n - 2, -1, -1):
+                x[i] = x[i] - m[i + 1] * x[i + 1]
+        return np.array(x, dtype=float)
+
+def thomas(a, b, c, d):
+    """
+    Solution of a tridiagonal system with the Thomas algorithm, O(n) (see TridiagonalFactor).
+    - a: array-like, sub-diagonal (n or n-1 values)
+    - b: array-like, diagonal (n values)
+    - c: array-like, super-diagonal (n or n-1 values)
+    - d: array-like, right-hand side (n,) or right-hand sides as columns (n, m)
+    Return
+    - x: array, shape of d
+    """
+    return TridiagonalFactor(a, b, c).solve(d)
+
+class BandedFactor(_Factorization):
+    def __init__(self, ab, l:int, u:int):
+        """
+        LU factorization with partial pivoting of a banded matrix (LAPACK gbtrf scheme): the row interchanges
+        widen the upper band of U to l+u, the storage stays O(n*(2*l+u+1)).
+        - ab: array-like, band storage (l+u+1, n), ab[u+i-j, j] = A[i, j] (LAPACK/scipy.linalg.solve_banded layout)
+        - l: int, number of sub-diagonals
+        - u: int, number of super-diagonals
+        Raise
+        - numpy.linalg.LinAlgError: singular matrix
+        Usage:
+        - band = BandedFactor(ab, l, u); x = band.solve(b): b with shape (n,) or (n, m)
+        - band = BandedFactor.from_dense(A): bandwidths detected from the nonzero entries
+        """
+        ab = np.asarray(ab, dtype=float)
+        if ab.ndim != 2 or ab.shape[0] != l + u + 1:
+            raise ValueError(f"band storage with {l + u + 1} rows expected, shape {ab.shape}")
+        n = self.n = ab.shape[1]
+        self.l, self.u = l, u
+        self.norm1 = np.abs(ab).sum(axis=0).max() if n else 0.
+        "work[l+u+i-j, j] = A[i, j]: l rows of fill-in on top, the multipliers below the diagonal row"
+        w = np.zeros((2 * l + u + 1, n))
+        w[l:] = ab
+        ku = l + u
+        piv = np.arange(n)
+        for k in range(n):
+            i_end = min(k + l, n - 1) # last row with a nonzero entry in column k
+            j_end = min(k + ku, n - 1) # last column of the pivot row in U
+            col = w[ku:ku + i_end - k + 1, k]
+            p = k + int(np.argmax(np.abs(col)))
+            if w[ku + p - k, k] == 0:
+                raise _singular(k)
+            piv[k] = p
+            js = np.arange(k, j_end + 1)
+            if p != k:
+                rk, rp = ku + k - js, ku + p - js
+                w[rk, js], w[rp, js] = w[rp, js], w[rk, js].copy()
+            if i_end > k:
+                mult = w[ku + 1:ku + i_end - k + 1, k]
+                mult /= w[ku, k]
+                if j_end > k:
+                    i = np.arange(k + 1, i_end + 1)[:, None]
+                    j = js[None, 1:]
+                    w[ku + i - j, j] -= mult[:, None] * w[ku + k - j, j]
+        self._w = w
+        self.piv = piv
+
+    @classmethod
+    def from_dense(cls, A, l:int=None, u:int=None):
+        """
+        Banded factorization of a dense matrix.
+        - A: array-like, square matrix (n, n)
+        - l: int, default=None, number of sub-diagonals, detected from the nonzero entries if None
+        - u: int, default=None, number of super-diagonals, detected from the nonzero entries if None
+        """
+        A = np.asarray(A, dtype=float)
+        n = A.shape[0]
+        i, j = np.nonzero(A)
+        l = int(max((i - j).max(initial=0), 0)) if l is None else l
+        u = int(max((j - i).max(initial=0), 0)) if u is None else u
+        ab = np.zeros((l + u + 1, n))
+        for k in range(-l, u + 1):
+            diag = np.diagonal(A, k)
+            ab[u - k, max(k, 0):max(k, 0) + diag.size] = diag
+        return cls(ab, l, u)
+
+    def solve(self, b, trans:bool=False):
+        """
+        Solution of A x = b (or A^T x = b), O(n*(2*l+u)) for each right-hand side.
+        - b: array-like, right-hand side (n,) or right-hand sides as columns (n, m)
+        - trans: bool, default=False, the transposed system A^T x = b is solved
+        Return
+        - x: array, shape of b
+        """
+        w, piv, l, n = self._w, self.piv, self.l, self.n
+        ku = self.l + self.u
+        x = _rhs(b, n)
+        if not trans:
+            for k in range(n):
+                p = piv[k]
+                if p != k:
+                    x[[k, p]] = x[[p, k]]
+                i_end = min(k + l, n - 1)
+                if i_end > k:
+                    x[k + 1:i_end + 1] -= np.multiply.outer(w[ku + 1:ku + i_end - k + 1, k], x[k]) if x.ndim > 1 \
+                        else w[ku + 1:ku + i_end - k + 1, k] * x[k]
+            for k in range(n - 1, -1, -1):
+                j_end = min(k + ku, n - 1)
+                if j_end > k:
+                    js = np.arange(k + 1, j_end + 1)
+                    x[k] -= w[ku + k - js, js] @ x[k + 1:j_end + 1]
+                x[k] /= w[ku, k]
+            return x
+        "A^T x = b: U^T y = b, then the transposed multipliers and interchanges in reverse order"
+        for k in range(n):
+            j_0 = max(k - ku, 0)
+            if j_0 < k:
+                js = np.arange(j_0, k)
+                x[k] -= w[ku + js - k, k] @ x[j_0:k]
+            x[k] /= w[ku, k]
+        for k in range(n - 1, -1, -1):
+            i_end = min(k + l, n - 1)
+            if i_end > k:
+                x[k] -= w[ku + 1:ku + i_end - k + 1, k] @ x[k + 1:i_end + 1]
+            p = piv[k]
+            if p != k:
+                x[[k, p]] = x[[p, k]]
+        return x
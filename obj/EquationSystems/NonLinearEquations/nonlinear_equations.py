@@ -0,0 +1,189 @@
+import numpy as np
+from time import perf_counter
+from copy import deepcopy
+
+from obj.numerical_convergence import ConvergenceResult
+
+NC_SYSTEM_METHODS = ['broyden', 'newton']
+
+
+def _as_array(value, n, default=None):
+    "scalar or list setting to array of n values, None values replaced by default"
+    if value is None:
+        value = default
+    if np.ndim(value) == 0:
+        value = [value] * n
+    return np.array([default if v is None else v for v in value], dtype=float)
+
+def _fd_jacobian(resid, x, F, fd_step, x_min, x_max):
+    """
+    Forward finite difference Jacobian, a backward difference is used when
+    the forward step exceeds x_max. The step never leaves [x_min, x_max]: when
+    neither direction fits, it is reduced to the largest room available.
+    - resid: callable, residual function F(x)
+    - x: array, point where the Jacobian is computed
+    - F: array, residual in x
+    - fd_step: array, relative step of each variable
+    - x_min: array, minimum allowed value of each variable
+    - x_max: array, maximum allowed value of each variable
+    Return
+    - J: 2D array, Jacobian dF/dx
+    """
+    J = np.zeros((F.size, x.size))
+    for i in range(x.size):
+        h = fd_step[i] * max(abs(x[i]), 1.)
+        up, down = x_max[i] - x[i], x[i] - x_min[i]
+        if h > up:
+            h = -h if h <= down else (up if up >= down else -down)
+        if h == 0:
+            continue # x_min == x_max, the variable cannot be varied
+        x_h = x.copy()
+        x_h[i] += h
+        J[:, i] = (resid(x_h) - F) / h
+    return J
+
+def nc_system_dict(settings, function, inp_dict):
+    """
+    Convergence of multiple variables applied to function dictionary (both input and output):
+    several independent variables are varied together to reach several output targets, i.e.
+    solution of the nonlinear system y(x) - y_t = 0.
+    The Jacobian is computed by finite differences at the first step, then it is updated
+    with the Broyden method (or recomputed at each step with the Newton method).
+    - settings:
+        - 'tol': float or list[float], tolerance value of each target to assess the convergence
+        - 'x_names': list[str], independent variable names (i.e. dictionary keys)
+        - 'x_0': list[float], initial values of the independent variables
+        - 'x_min': list[float], [opt.] minimum allowed values for independent variables (None allowed)
+        - 'x_max': list[float], [opt.] maximum allowed values for independent variables (None allowed)
+        - 'y_t_names': list[str], output variable names (i.e. dictionary keys)
+        - 'y_t': list[float], output variable targets
+        - 'method': str, default='broyden', Jacobian update method:
+            - 'broyden': finite difference Jacobian at the first step, then Broyden updates
+            - 'newton': finite difference Jacobian at each step
+        - 'fd_step': float or list[float], default=1e-6, finite difference relative step
+        - 'damping': float, default=1, step scaling factor (0-1]
+        - 'backtracking': int, default=6, maximum number of step halvings when the residual does not decrease
+        - 'count_max': int, default=100, maximum number of iterations
+        - 'DEBUG': bool, enables debugging printouts
+        - 'printout': print final result
+        - 'result': bool, default=False, a ConvergenceResult is returned
+    - function: function taking the input dictionary and returning the output dictionary
+    - inp_dict: dict, input dictionary, the independent variables are set into it
+    Return
+    - inp_dict: dict, input dictionary at convergence (including the fields written by the function at convergence)
+    - res: dict, function output at convergence
+    """
+    x_names = settings.get('x_names')
+    y_t_names = settings.get('y_t_names')
+    n = len(x_names)
+    tol = _as_array(settings.get('tol'), len(y_t_names))
+    y_t = _as_array(settings.get('y_t'), len(y_t_names))
+    x_min = _as_array(settings.get('x_min'), n, -np.inf)
+    x_max = _as_array(settings.get('x_max'), n, np.inf)
+    method = settings.get('method', 'broyden')
+    fd_step = _as_array(settings.get('fd_step'), n, 1e-6)
+    damping = settings.get('damping', 1)
+    backtracking = settings.get('backtracking', 6)
+    count_max = settings.get('count_max', 100)
+    DEBUG = settings.get('DEBUG', False)
+    printout = settings.get('printout', False)
+    if method not in NC_SYSTEM_METHODS:
+        raise ValueError(f"Method '{method}' not available, allowed methods: {NC_SYSTEM_METHODS}")
+    t0 = perf_counter()
+
+    values = {} # evaluation cache: tuple(x) -> (function output snapshot, input dictionary snapshot)
+    hits = [0]
+
+    def function_wrapper(x):
+        key = tuple(x)
+        if key in values:
+            hits[0] += 1
+        else:
+            for name, x_i in zip(x_names, x):
+                inp_dict[name] = float(x_i)
+            res = function(inp_dict)
+            "snapshots: the model may return a mutated dictionary, or write its outputs into the input dictionary"
+            res_copy = deepcopy(res)
+            values[key] = (res_copy, res_copy if res is inp_dict else deepcopy(inp_dict))
+        return values[key][0]
+
+    def resid(x):
+        res = function_wrapper(x)
+        return np.array([res[name] for name in y_t_names], dtype=float) - y_t
+
+    def norm(F):
+        return np.linalg.norm(F / tol)
+
+    "initialization"
+    x = np.clip(_as_array(settings.get('x_0'), n), x_min, x_max)
+    F = resid(x)
+    J = None
+    jac_fresh = False
+    conv = False
+    count = 0
+
+    while True:
+        if DEBUG:
+            print(f"{count} err: {np.abs(F).max():.4g} - x = {x} - y = {F + y_t}")
+        if np.all(np.abs(F) <= tol):
+            conv = True
+            break
+        if count >= count_max:
+            if DEBUG:
+                print("Iteration count limit reached. Exit the loop.")
+            break
+
+        if J is None:
+            J = _fd_jacobian(resid, x, F, fd_step, x_min, x_max)
+            jac_fresh = True
+        try:
+            dx = np.linalg.solve(J, -F)
+        except np.linalg.LinAlgError:
+            dx = np.linalg.lstsq(J, -F, rcond=None)[0]
+
+        "damped step with backtracking on the residual norm"
+        lam = damping
+        for _ in range(backtracking + 1):
+            x_new = np.clip(x + lam * dx, x_min, x_max)
+            F_new = resid(x_new)
+            if norm(F_new) < norm(F):
+                break
+            lam /= 2
+        else:
+            if jac_fresh:
+                if DEBUG:
+                    print("The residual cannot be reduced. Exit the loop.")
+                break
+            "the Broyden Jacobian is not reliable anymore, it is recomputed"
+            J = None
+            continue
+
+        count += 1
+        s = x_new - x
+        if method == 'broyden' and s @ s > 0:
+            J = J + np.outer(F_new - F - J @ s, s) / (s @ s)
+            jac_fresh = False
+        else:
+            J = None
+        x, F = x_new, F_new
+
+    "input dictionary restored in place to its state at the returned x (the fields written by the model included)"
+    function_wrapper(x)
+    res, inp = values[tuple(x)]
+    inp_dict.clear()
+    inp_dict.update(deepcopy(inp))
+    if inp is res:
+        res = inp_dict
+
+    if printout:
+        s = "Convergence reached!" if conv else "Convergence not reached!"
+        s += f"\n\tIterations: {count} - Evaluations: {len(values)} - Error: {np.abs(F).max():.4f}"
+        for name, x_i in zip(x_names, x):
+            s += f"\n{name} = {x_i:.4f}"
+        for name, y_i, y_t_i in zip(y_t_names, F + y_t, y_t):
+            s += f"\n{name} = {y_i:.4f} - y_t = {y_t_i:.4f}"
+        print(s)
+    if settings.get('result', False):
+        return ConvergenceResult(x, F + y_t, conv, count, len(values), hits[0], perf_counter() - t0,
+                                 inp_dict=inp_dict, res=res)
+    return inp_dict, res
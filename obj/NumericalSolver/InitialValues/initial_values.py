@@ -0,0 +1,423 @@
+import numpy as np
+
+from obj.instrumentation import timed
+
+"""
+Batched explicit Runge-Kutta integration: many similar initial value problems advanced together as one state
+matrix (one row per member), each member with its own step size; the finished members are masked out.
+"""
+
+"Dormand-Prince 5(4) tableau, FSAL: the last stage of an accepted step is the first stage of the next one"
+_C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+_A = [np.array([]),
+      np.array([1/5]),
+      np.array([3/40, 9/40]),
+      np.array([44/45, -56/15, 32/9]),
+      np.array([19372/6561, -25360/2187, 64448/6561, -212/729]),
+      np.array([9017/3168, -355/33, 46732/5247, 49/176, -5103/18656])]
+_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+"error weights: 5th order minus 4th order solution, 7 stages"
+_E = np.array([-71/57600, 0, 71/16695, -71/1920, 17253/339200, -22/525, 1/40])
+"4th order continuous extension (Shampine): y(t + x h) = y + h * (K^T P) [x, x^2, x^3, x^4]"
+_P = np.array([
+    [1, -8048581381/2820520608, 8663915743/2820520608, -12715105075/11282082432],
+    [0, 0, 0, 0],
+    [0, 131558114200/32700410799, -68118460800/10900136933, 87487479700/32700410799],
+    [0, -1754552775/470086768, 14199869525/1410260304, -10690763975/1880347072],
+    [0, 127303824393/49829197408, -318862633887/49829197408, 701980252875/199316789632],
+    [0, -282668133/205662961, 2019193451/616988883, -1453857185/822651844],
+    [0, 40617522/29380423, -110615467/29380423, 69997945/29380423]])
+
+IVP_STATUS = {0: 't_end reached', 1: 'terminal event', -1: 'step size too small', -2: 'step_max reached'}
+_ORDER = 4 # error estimator order, step factor exponent -1/(order+1)
+_SAFETY = 0.9
+_FACTOR_MIN = 0.2
+_FACTOR_MAX = 10.
+
+
+def _rms(v):
+    return np.sqrt(np.mean(v * v, axis=1))
+
+def _interp(t_old, sh, y_old, Q, t):
+    "continuous extension of the steps: arrays of the members, t with shape (a,)"
+    x = (t - t_old) / sh
+    xp = np.stack([x, x**2, x**3, x**4], axis=1) # (a, 4)
+    return y_old + sh[:, None] * np.einsum('anp,ap->an', Q, xp)
+
+class _Args:
+    def __init__(self, args, m, indexed=None):
+        "additional inputs of the members: arrays with first axis m are indexed, scalars passed unchanged"
+        self.args = [np.asarray(arg) for arg in args]
+        self.indexed = [arg.ndim > 0 and arg.shape[0] == m for arg in self.args] if indexed is None else indexed
+
+    def take(self, idx):
+        return [arg[idx] if indexed else arg for arg, indexed in zip(self.args, self.indexed)]
+
+    def subset(self, idx):
+        "_Args of the members idx"
+        return _Args(self.take(idx), None, self.indexed)
+
+class IvpDenseOutput:
+    def __init__(self, steps:list, t_0, t_f, direction:float, n:int):
+        """
+        Continuous solution of the members over the accepted steps, 4th order interpolant.
+        - steps: list, (idx, t_old, sh, y_old, Q) records of the accepted steps
+        - t_0: array, initial time of each member
+        - t_f: array, final time of each member
+        - direction: float, integration direction (+1 or -1)
+        - n: int, number of state variables
+        Usage:
+        - sol(t): t float or array (m,), state of each member at t, NaN outside [t_0, t_f]
+        """
+        self.t_0 = t_0
+        self.t_f = t_f
+        self.direction = direction
+        m = t_0.size
+        if steps:
+            idx, t_old, sh, y_old, Q = [np.concatenate(v) for v in zip(*steps)]
+        else:
+            idx, t_old, sh, y_old, Q = (np.zeros(0, int), np.zeros(0), np.zeros(0), np.zeros((0, n)), np.zeros((0, n, 4)))
+        "records grouped by member, in chronological order (steps appended in time order for each member)"
+        order = np.argsort(idx, kind='stable')
+        self._t_old, self._sh, self._y_old, self._Q = t_old[order], sh[order], y_old[order], Q[order]
+        counts = np.bincount(idx, minlength=m)
+        self._start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self._count = counts
+        self.n = n
+
+    def __call__(self, t):
+        m = self.t_0.size
+        t = np.broadcast_to(np.asarray(t, dtype=float), (m,))
+        d = self.direction
+        y = np.full((m, self.n), np.nan)
+        ok = (d * (t - self.t_0) >= 0) & (d * (self.t_f - t) >= 0) & (self._count > 0)
+        if not ok.any():
+            return y
+        i = np.nonzero(ok)[0]
+        tq = t[i]
+        "vectorized bisection: last step of each member starting before t"
+        lo = self._start[i].copy()
+        hi = lo + self._count[i]
+        while True:
+            open_ = hi - lo > 1
+            if not open_.any():
+                break
+            mid = (lo + hi) // 2
+            right = open_ & (d * self._t_old[mid] <= d * tq)
+            lo = np.where(right, mid, lo)
+            hi = np.where(open_ & ~right, mid, hi)
+        y[i] = _interp(self._t_old[lo], self._sh[lo], self._y_old[lo], self._Q[lo], tq)
+        return y
+
+class IvpResult:
+    def __init__(self, t, y, status, nfev, nstep, nreject, t_eval=None, y_eval=None, t_events=None, y_events=None,
+                 sol=None, time=0.):
+        """
+        Result of a batched integration, first axis along the members.
+        - t: array (m,), final time of each member
+        - y: array (m, n), final state of each member
+        - status: array[int] (m,), see IVP_STATUS: 0 t_end reached, 1 terminal event, -1 step size too small,
+                  -2 step_max reached
+        - nfev: array[int] (m,), function evaluations of each member
+        - nstep: array[int] (m,), accepted steps of each member
+        - nreject: array[int] (m,), rejected steps of each member
+        - t_eval: array, output times (if requested)
+        - y_eval: array (m, len(t_eval), n), state at the output times, NaN beyond the final time of the member
+        - t_events: list, for each event the list of the event times of each member (arrays)
+        - y_events: list, for each event the list of the states at the event times of each member (arrays)
+        - sol: IvpDenseOutput, continuous solution (if requested)
+        - time: float, wall time [s]
+        """
+        self.t = t
+        self.y = y
+        self.status = status
+        self.nfev = nfev
+        self.nstep = nstep
+        self.nreject = nreject
+        self.t_eval = t_eval
+        self.y_eval = y_eval
+        self.t_events = t_events
+        self.y_events = y_events
+        self.sol = sol
+        self.time = time
+
+    @property
+    def success(self):
+        "array[bool], members integrated up to t_end or stopped by a terminal event"
+        return self.status >= 0
+
+    def __repr__(self):
+        counts = {IVP_STATUS[s]: int((self.status == s).sum()) for s in IVP_STATUS if (self.status == s).any()}
+        return (f"IvpResult(members={self.t.size}, status={counts}, nfev={int(self.nfev.sum())}, "
+                f"nstep={int(self.nstep.sum())}, nreject={int(self.nreject.sum())}, time={self.time:.6f})")
+
+def _initial_step(fun, t, y, f, sh_max, direction, rtol, atol, args):
+    "initial step of each member (Hairer, Norsett, Wanner, Solving ODE I, II.4)"
+    scale = atol + np.abs(y) * rtol
+    d0 = _rms(y / scale)
+    d1 = _rms(f / scale)
+    h0 = np.where((d0 < 1e-5) | (d1 < 1e-5), 1e-6, 0.01 * d0 / np.where(d1 > 0, d1, 1.))
+    h0 = np.minimum(h0, sh_max)
+    f1 = fun(t + direction * h0, y + direction * h0[:, None] * f, args)
+    d2 = _rms((f1 - f) / scale) / h0
+    d12 = np.maximum(d1, d2)
+    h1 = np.where(d12 <= 1e-15, np.maximum(1e-6, h0 * 1e-3), (0.01 / np.where(d12 > 0, d12, 1.)) ** (1 / (_ORDER + 1)))
+    return np.minimum(np.minimum(100 * h0, h1), sh_max)
+
+def _event_roots(event, t_l, t_r, g_l, g_r, dense, args, itmax=100):
+    """
+    Event times inside the steps by the Illinois method on the continuous extension, vectorized on the members.
+    - event: callable, event(t, y, args) -> array
+    - t_l, t_r: arrays, step bounds (sign change of the event function between them)
+    - g_l, g_r: arrays, event function at the step bounds
+    - dense: tuple, (t_old, sh, y_old, Q) of the steps
+    - args: _Args, additional inputs of the members
+    """
+    t_l, t_r, g_l, g_r = t_l.copy(), t_r.copy(), g_l.copy(), g_r.copy()
+    t_old, sh, y_old, Q = dense
+    root = t_r.copy()
+    side = np.zeros(t_l.size, dtype=int)
+    xtol = 4 * np.finfo(float).eps * np.maximum(np.abs(t_l), np.abs(t_r)) + 1e-12 * np.abs(sh)
+    act = np.arange(t_l.size)
+    for _ in range(itmax):
+        act = act[np.abs(t_r[act] - t_l[act]) > xtol[act]]
+        if act.size == 0:
+            break
+        gl, gr = g_l[act], g_r[act]
+        tm = (t_l[act] * gr - t_r[act] * gl) / (gr - gl)
+        y_m = _interp(t_old[act], sh[act], y_old[act], Q[act], tm)
+        gm = event(tm, y_m, args.take(act))
+        root[act] = tm
+        zero = gm == 0
+        same_r = (gm * gr > 0) & ~zero
+        same_l = ~same_r & ~zero
+        "Illinois: the retained end point value is halved when the same end point is kept twice"
+        i = act[same_r]
+        t_r[i], g_r[i] = tm[same_r], gm[same_r]
+        g_l[i[side[i] == -1]] *= 0.5
+        side[i] = -1
+        i = act[same_l]
+        t_l[i], g_l[i] = tm[same_l], gm[same_l]
+        g_r[i[side[i] == 1]] *= 0.5
+        side[i] = 1
+        i = act[zero]
+        t_l[i] = t_r[i] = tm[zero]
+    "the root is taken on the far side of the sign change: the event has occurred at the reported time"
+    return np.where(np.abs(t_r - t_l) <= xtol, t_r, root)
+
+@timed()
+def ivp_batch(settings, function, y_0, *args):
+    """
+    Batched integration of initial value problems dy/dt = f(t, y) with the embedded Runge-Kutta method of
+    Dormand-Prince (RK45): the members are advanced together as a state matrix, each member with its own
+    adaptive step size, the members reaching t_end (or a terminal event) are excluded from the next steps.
+    - settings:
+        - 't_0': float or array, initial time of each member
+        - 't_end': float or array, final time of each member (same integration direction for all the members)
+        - 'rtol': float, default=1e-6, relative tolerance of the local error
+        - 'atol': float or array (n,), default=1e-9, absolute tolerance of the local error
+        - 'h_0': float or array, default=None, initial step size, estimated for each member if None
+        - 'h_max': float, default=inf, maximum step size
+        - 'step_max': int, default=100000, maximum number of steps of each member (accepted and rejected)
+        - 't_eval': array, default=None, output times (sorted in the integration direction), see IvpResult.y_eval
+        - 'dense': bool, default=False, the continuous solution is stored (IvpResult.sol)
+        - 'events': list[callable], default=[], event functions event(t, y, *args) -> array (a,), an event occurs
+                    where the function changes sign
+        - 'terminal': bool or list[bool], default=False, the member integration stops at the event
+        - 'direction': int or list[int], default=0, only the zero crossings from negative to positive (1),
+                       from positive to negative (-1) or both (0)
+        - 'printout': bool, default=False, print the result summary
+    - function: vectorized function f(t, y, *args) -> dydt, called for the a members still running with t (a,),
+                y (a, n) and the args of those members, it returns an array (a, n)
+    - y_0: array (m, n), initial state of each member (m members, n state variables), (n,) for a single member
+    - args: additional inputs (float or array with first axis m), not varied during the integration
+    Return
+    - result: IvpResult
+    """
+    from time import perf_counter
+    t_start = perf_counter()
+    y_0 = np.asarray(y_0, dtype=float)
+    y = np.atleast_2d(y_0).copy()
+    m, n = y.shape
+    t = np.broadcast_to(np.asarray(settings.get('t_0', 0.), dtype=float), (m,)).copy()
+    t_end = np.broadcast_to(np.asarray(settings.get('t_end'), dtype=float), (m,)).copy()
+    rtol = settings.get('rtol', 1e-6)
+    atol = np.asarray(settings.get('atol', 1e-9), dtype=float)
+    h_max = settings.get('h_max', np.inf)
+    step_max = settings.get('step_max', 100000)
+    t_eval = settings.get('t_eval')
+    dense = settings.get('dense', False)
+    events = list(settings.get('events', []))
+    n_ev = len(events)
+    terminal = settings.get('terminal', False)
+    terminal = np.broadcast_to(np.asarray(terminal, dtype=bool), (n_ev,)) if n_ev else np.zeros(0, bool)
+    ev_direction = np.broadcast_to(np.asarray(settings.get('direction', 0)), (n_ev,)) if n_ev else np.zeros(0)
+    printout = settings.get('printout', False)
+
+    span = t_end - t
+    if (span > 0).any() and (span < 0).any():
+        raise ValueError("All the members must be integrated in the same direction")
+    direction = -1. if (span < 0).any() else 1.
+    arg_list = _Args(args, m)
+    nfev = np.zeros(m, dtype=int)
+
+    def fun(t, y, a_args):
+        return np.asarray(function(t, y, *a_args), dtype=float).reshape(y.shape)
+
+    def ev(k, t, y, a_args):
+        return np.asarray(events[k](t, y, *a_args), dtype=float).reshape(t.shape)
+
+    status = np.zeros(m, dtype=int)
+    nstep = np.zeros(m, dtype=int)
+    nreject = np.zeros(m, dtype=int)
+    active = span != 0
+    idx = np.nonzero(active)[0]
+    a_args = arg_list.take(idx)
+    f = np.zeros((m, n))
+    f[idx] = fun(t[idx], y[idx], a_args)
+    nfev[idx] += 1
+    h = np.zeros(m)
+    h_0 = settings.get('h_0')
+    if h_0 is not None:
+        h[:] = np.abs(np.broadcast_to(np.asarray(h_0, dtype=float), (m,)))
+    elif idx.size:
+        h[idx] = _initial_step(fun, t[idx], y[idx], f[idx], np.minimum(np.abs(span[idx]), h_max), direction,
+                               rtol, atol, a_args)
+        nfev[idx] += 1
+    rejected = np.zeros(m, dtype=bool)
+
+    t_0 = t.copy()
+    g = np.zeros((m, n_ev))
+    for k in range(n_ev):
+        g[idx, k] = ev(k, t[idx], y[idx], a_args)
+    ev_records = [[] for _ in range(n_ev)]
+    if t_eval is not None:
+        t_eval = np.asarray(t_eval, dtype=float)
+        y_eval = np.full((m, t_eval.size, n), np.nan)
+        key_eval = direction * t_eval
+        "output times at the initial time of each member"
+        at_0 = t_eval[None, :] == t_0[:, None]
+        y_eval[at_0] = np.repeat(y, at_0.sum(axis=1), axis=0)
+    steps = []
+
+    while idx.size:
+        ta, ya, ha, fa = t[idx], y[idx], h[idx], f[idx]
+        "last step clipped to t_end"
+        remaining = np.abs(t_end[idx] - ta)
+        last = ha >= remaining
+        ha = np.where(last, remaining, ha)
+        h_min = 10 * np.abs(np.nextafter(ta, direction * np.inf) - ta)
+        small = ha < h_min
+        if small.any():
+            status[idx[small]] = -1
+            active[idx[small]] = False
+            keep = ~small
+            idx, ta, ya, ha, fa, last = idx[keep], ta[keep], ya[keep], ha[keep], fa[keep], last[keep]
+            if idx.size == 0:
+                break
+        a_args = arg_list.take(idx)
+        sh = direction * ha
+        K = np.empty((7, idx.size, n))
+        K[0] = fa
+        for s in range(1, 6):
+            dy = np.tensordot(_A[s], K[:s], axes=1)
+            K[s] = fun(ta + _C[s] * sh, ya + sh[:, None] * dy, a_args)
+        y_new = ya + sh[:, None] * np.tensordot(_B, K[:6], axes=1)
+        t_new = np.where(last, t_end[idx], ta + sh)
+        K[6] = fun(t_new, y_new, a_args)
+        nfev[idx] += 6
+        err = sh[:, None] * np.tensordot(_E, K, axes=1)
+        scale = atol + np.maximum(np.abs(ya), np.abs(y_new)) * rtol
+        err_norm = _rms(err / scale)
+        accept = err_norm < 1
+        with np.errstate(divide='ignore'):
+            factor = np.where(err_norm == 0, _FACTOR_MAX,
+                              np.clip(_SAFETY * err_norm ** (-1 / (_ORDER + 1)), _FACTOR_MIN, _FACTOR_MAX))
+        "no step increase right after a rejection"
+        factor = np.where(rejected[idx], np.minimum(factor, 1.), factor)
+        h[idx] = np.minimum(np.where(accept, ha * factor, ha * np.minimum(factor, 1.)), h_max)
+        rejected[idx] = ~accept
+        nreject[idx[~accept]] += 1
+
+        "accepted steps: members advanced, FSAL stage"
+        acc = np.nonzero(accept)[0]
+        i_acc = idx[acc]
+        nstep[i_acc] += 1
+        if acc.size:
+            t_old, y_old, sh_a = ta[acc], ya[acc], sh[acc]
+            t_acc, y_acc = t_new[acc], y_new[acc]
+            Q = np.einsum('kan,kp->anp', K[:, acc], _P)
+            step = (t_old, sh_a, y_old, Q)
+            t_stop = t_acc.copy()
+            stop = last[acc].copy()
+            stop_ev = np.zeros(acc.size, dtype=bool)
+            if n_ev:
+                acc_args = arg_list.subset(i_acc)
+                roots = []
+                for k in range(n_ev):
+                    g_old = g[i_acc, k]
+                    g_new = ev(k, t_acc, y_acc, acc_args.args)
+                    up = (g_old < 0) & (g_new >= 0)
+                    down = (g_old > 0) & (g_new <= 0)
+                    cross = up if ev_direction[k] > 0 else down if ev_direction[k] < 0 else up | down
+                    j = np.nonzero(cross)[0]
+                    t_root = _event_roots(lambda tt, yy, aa, k=k: ev(k, tt, yy, aa), t_old[j], t_acc[j],
+                                          g_old[j], g_new[j], tuple(v[j] for v in step),
+                                          acc_args.subset(j)) if j.size else np.zeros(0)
+                    roots.append((j, t_root))
+                    g[i_acc, k] = g_new
+                    if terminal[k] and j.size:
+                        "earliest terminal event of the step"
+                        t_stop[j] = np.where(direction * t_root < direction * t_stop[j], t_root, t_stop[j])
+                        stop_ev[j] = True
+                for k, (j, t_root) in enumerate(roots):
+                    "events after a terminal event of the same step are discarded"
+                    keep = direction * t_root <= direction * t_stop[j]
+                    j, t_root = j[keep], t_root[keep]
+                    if j.size:
+                        y_root = _interp(t_old[j], sh_a[j], y_old[j], Q[j], t_root)
+                        ev_records[k].append((i_acc[j], t_root, y_root))
+                if stop_ev.any():
+                    e = np.nonzero(stop_ev)[0]
+                    y_acc[e] = _interp(t_old[e], sh_a[e], y_old[e], Q[e], t_stop[e])
+                    t_acc[e] = t_stop[e]
+            if t_eval is not None:
+                "output times inside the step: (t_old, t_stop]"
+                j_lo = np.searchsorted(key_eval, direction * t_old, side='right')
+                j_hi = np.searchsorted(key_eval, direction * t_acc, side='right')
+                for p in range(int((j_hi - j_lo).max(initial=0))):
+                    sel = np.nonzero(j_hi - j_lo > p)[0]
+                    je = j_lo[sel] + p
+                    y_eval[i_acc[sel], je] = _interp(t_old[sel], sh_a[sel], y_old[sel], Q[sel], t_eval[je])
+            if dense:
+                steps.append((i_acc, t_old, sh_a, y_old, Q))
+            t[i_acc] = t_acc
+            y[i_acc] = y_acc
+            f[i_acc] = K[6, acc]
+            status[i_acc[stop_ev]] = 1
+            active[i_acc[stop | stop_ev]] = False
+
+        over = active[idx] & (nstep[idx] + nreject[idx] >= step_max)
+        status[idx[over]] = -2
+        active[idx[over]] = False
+        idx = idx[active[idx]]
+
+    t_events = y_events = None
+    if n_ev:
+        t_events, y_events = [], []
+        for records in ev_records:
+            if records:
+                i_ev, t_ev, y_ev = [np.concatenate(v) for v in zip(*records)]
+            else:
+                i_ev, t_ev, y_ev = np.zeros(0, int), np.zeros(0), np.zeros((0, n))
+            order = np.argsort(i_ev, kind='stable')
+            split = np.cumsum(np.bincount(i_ev, minlength=m))[:-1]
+            t_events.append(np.split(t_ev[order], split))
+            y_events.append(np.split(y_ev[order], split))
+    sol = IvpDenseOutput(steps, t_0, t.copy(), direction, n) if dense else None
+    result = IvpResult(t, y if y_0.ndim > 1 else y[0], status, nfev, nstep, nreject,
+                       t_eval, (y_eval if y_0.ndim > 1 else y_eval[0]) if t_eval is not None else None,
+                       t_events, y_events, sol, perf_counter() - t_start)
+    if printout:
+        print(result)
+    return result
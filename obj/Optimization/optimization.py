@@ -0,0 +1,422 @@
+import numpy as np
+from time import perf_counter
+from copy import deepcopy
+
+from obj.numerical_convergence import ConvergenceResult
+from obj.decorators import _quantize, _store_key, _MemoStore
+from obj.EquationSystems.NonLinearEquations.nonlinear_equations import _as_array
+from obj.instrumentation import timed
+
+OPT_METHODS = ['nelder-mead', 'pattern']
+
+
+class _Objective:
+    def __init__(self, function, inp_dict, x_names, y_name, sign=1., store=None, rtol=1e-12, values=None):
+        """
+        Objective of the dictionary function, with per-solve evaluation cache (no x is evaluated twice) and optional
+        store shared by the processes (see decorators.memoize), keyed by the input dictionary given (before any
+        evaluation: the outputs written into it by the function are not part of the key) and x.
+        - function: callable, function(inp_dict) -> res
+        - inp_dict: dict, input dictionary, the independent variables are set into it
+        - x_names: list[str], independent variable names
+        - y_name: str, output variable to be minimized
+        - sign: float, default=1, -1 to maximize
+        - store: str, default=None, sqlite file of the shared evaluations (TypeError for inputs whose repr is
+                 their identity, see decorators.memoize)
+        - rtol: float, default=1e-12, relative tolerance of the store keys
+        - values: dict, default=None, evaluation cache shared with other solves in the same process,
+                  {x: (y, snapshot of the output, snapshot of the input dictionary)}
+        """
+        self.function = function
+        self.inp_dict = inp_dict
+        self.x_names = x_names
+        self.y_name = y_name
+        self.sign = sign
+        self.store = _MemoStore(store) if store is not None else None
+        self.name = f"{getattr(function, '__module__', '')}.{getattr(function, '__qualname__', repr(function))}"
+        self.rtol = rtol
+        self.inputs = _quantize({k: v for k, v in inp_dict.items() if k not in x_names}, rtol) if self.store is not None else None
+        self.values = {} if values is None else values
+        self.evaluations = 0
+        self.hits = 0
+
+    def _evaluate(self, key):
+        """
+        (y, snapshot of the output, snapshot of the input dictionary after the evaluation) in x, from the store or
+        by the function. The input snapshot is the output snapshot itself when the function returns the input dictionary.
+        """
+        value = None
+        if self.store is not None:
+            store_key = _store_key((self.inputs, _quantize(key, self.rtol)))
+            try:
+                value = self.store.get(self.name, store_key)
+                self.hits += 1
+            except KeyError:
+                pass
+        if value is None:
+            for name, x_i in zip(self.x_names, key):
+                self.inp_dict[name] = x_i
+            "snapshot: the function can return (and later modify) the input dictionary itself"
+            res = self.function(self.inp_dict)
+            value = (deepcopy(res), None if res is self.inp_dict else deepcopy(self.inp_dict))
+            self.evaluations += 1
+            if self.store is not None:
+                self.store.set(self.name, store_key, value)
+        res, inp = value
+        return float(res[self.y_name]), res, res if inp is None else inp
+
+    def restore(self, x):
+        """
+        Input dictionary restored in place to its state after the evaluation of x (the fields written by the function
+        belong to x), x evaluated if not available yet (cache hit not counted).
+        Return
+        - res: output of x (copy of the snapshot), the input dictionary itself if the function returns it
+        """
+        key = tuple(x.tolist())
+        if key not in self.values:
+            self.values[key] = self._evaluate(key)
+        _, res, inp = self.values[key]
+        self.inp_dict.clear()
+        self.inp_dict.update(deepcopy(inp))
+        return self.inp_dict if inp is res else deepcopy(res)
+
+    def __call__(self, x):
+        key = tuple(x.tolist())
+        if key in self.values:
+            self.hits += 1
+        else:
+            self.values[key] = self._evaluate(key)
+        return self.sign * self.values[key][0]
+
+def _nelder_mead(f, x_0, delta, x_min, x_max, xtol, ftol, count_max, DEBUG=False):
+    """
+    Nelder-Mead simplex method, the trial points are projected into the bounds.
+    - f: callable, objective f(x) -> float
+    - x_0: array, starting point
+    - delta: array, initial simplex size of each variable
+    - x_min, x_max: arrays, bounds of the variables
+    - xtol: array, convergence tolerance of the variables (simplex size)
+    - ftol: float, convergence tolerance of the objective (simplex spread)
+    - count_max: int, maximum number of iterations
+    Return
+    - x, y, conv, count, size: best point, objective, convergence flag, iterations, final simplex size
+    """
+    n = x_0.size
+    simplex = [x_0]
+    for i in range(n):
+        x = x_0.copy()
+        x[i] = x[i] + delta[i] if x[i] + delta[i] <= x_max[i] else x[i] - delta[i]
+        simplex.append(np.clip(x, x_min, x_max))
+    simplex = np.array(simplex)
+    fs = np.array([f(x) for x in simplex])
+    count = 0
+    conv = False
+    while True:
+        order = np.argsort(fs, kind='stable')
+        simplex, fs = simplex[order], fs[order]
+        size = np.abs(simplex[1:] - simplex[0]).max(axis=0)
+        if DEBUG:
+            print(f"{count} y = {fs[0]:.6g} - x = {simplex[0]}")
+        if np.all(size <= xtol) and fs[-1] - fs[0] <= ftol:
+            conv = True
+            break
+        if count >= count_max:
+            if DEBUG:
+                print("Iteration count limit reached. Exit the loop.")
+            break
+        count += 1
+        centroid = simplex[:-1].mean(axis=0)
+        x_r = np.clip(centroid + (centroid - simplex[-1]), x_min, x_max)
+        f_r = f(x_r)
+        if f_r < fs[0]:
+            x_e = np.clip(centroid + 2 * (centroid - simplex[-1]), x_min, x_max)
+            f_e = f(x_e)
+            simplex[-1], fs[-1] = (x_e, f_e) if f_e < f_r else (x_r, f_r)
+            continue
+        if f_r < fs[-2]:
+            simplex[-1], fs[-1] = x_r, f_r
+            continue
+        "contraction: outside if the reflected point is better than the worst, inside otherwise"
+        if f_r < fs[-1]:
+            x_c = centroid + 0.5 * (x_r - centroid)
+        else:
+            x_c = centroid + 0.5 * (simplex[-1] - centroid)
+        f_c = f(x_c)
+        if f_c < min(f_r, fs[-1]):
+            simplex[-1], fs[-1] = x_c, f_c
+            continue
+        "shrink towards the best point"
+        simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+        fs[1:] = [f(x) for x in simplex[1:]]
+    return simplex[0], fs[0], conv, count, size
+
+def _pattern(f, x_0, delta, x_min, x_max, xtol, delta_scaler, count_max, DEBUG=False):
+    """
+    Pattern search (Hooke-Jeeves): exploratory moves along each variable, pattern moves along the improving
+    direction, the steps are divided by delta_scaler when no improvement is found. The points are kept in the bounds.
+    - f: callable, objective f(x) -> float
+    - x_0: array, starting point
+    - delta: array, initial step of each variable
+    - x_min, x_max: arrays, bounds of the variables
+    - xtol: array, convergence tolerance of the variables (step size)
+    - delta_scaler: float, step reduction factor
+    - count_max: int, maximum number of iterations
+    Return
+    - x, y, conv, count, size: best point, objective, convergence flag, iterations, final step size
+    """
+    def explore(x, y, step):
+        x = x.copy()
+        for i in range(x.size):
+            for s in (step[i], -step[i]):
+                x_t = x.copy()
+                x_t[i] = min(max(x[i] + s, x_min[i]), x_max[i])
+                if x_t[i] == x[i]:
+                    continue
+                y_t = f(x_t)
+                if y_t < y:
+                    x, y = x_t, y_t
+                    break
+        return x, y
+
+    base = np.clip(x_0, x_min, x_max)
+    y_base = f(base)
+    step = delta.copy()
+    count = 0
+    conv = False
+    while True:
+        if DEBUG:
+            print(f"{count} y = {y_base:.6g} - x = {base} - step = {step}")
+        if np.all(step <= xtol):
+            conv = True
+            break
+        if count >= count_max:
+            if DEBUG:
+                print("Iteration count limit reached. Exit the loop.")
+            break
+        count += 1
+        x, y = explore(base, y_base, step)
+        if y < y_base:
+            "pattern moves while the exploration around the extrapolated point improves"
+            while count < count_max:
+                x_p = np.clip(x + (x - base), x_min, x_max)
+                base, y_base = x, y
+                x, y = explore(x_p, f(x_p), step)
+                count += 1
+                if not y < y_base:
+                    break
+            if y < y_base:
+                base, y_base = x, y
+        else:
+            step = step / delta_scaler
+    return base, y_base, conv, count, step
+
+def _opt_dict(settings, function, inp_dict, store=None, values=None):
+    """
+    Solution of opt_function_dict.
+    - store: str, default=None, sqlite file of the evaluations shared by the processes
+    - values: dict, default=None, evaluation cache shared by the solves in this process
+    Return
+    - result: ConvergenceResult, y is the objective (output value), delta the final simplex/step size
+    """
+    x_names = settings.get('x_names')
+    y_name = settings.get('y_name')
+    n = len(x_names)
+    x_min = _as_array(settings.get('x_min'), n, -np.inf)
+    x_max = _as_array(settings.get('x_max'), n, np.inf)
+    if settings.get('x_0') is None:
+        raise ValueError("Initial values 'x_0' are required")
+    x_0 = np.clip(_as_array(settings.get('x_0'), n), x_min, x_max)
+    if not np.all(np.isfinite(x_0)):
+        raise ValueError(f"Initial values 'x_0' must be finite: {x_0.tolist()}")
+    method = settings.get('method', 'nelder-mead')
+    delta = settings.get('delta')
+    delta = np.where(x_0 != 0, 0.05 * np.abs(x_0), 0.00025) if delta is None else _as_array(delta, n)
+    xtol = _as_array(settings.get('xtol', 1e-4), n)
+    ftol = settings.get('ftol', 1e-6)
+    delta_scaler = settings.get('delta_scaler', 2)
+    count_max = settings.get('count_max', 200 * n)
+    sign = -1. if settings.get('maximize', False) else 1.
+    DEBUG = settings.get('DEBUG', False)
+    if method not in OPT_METHODS:
+        raise ValueError(f"Method '{method}' not available, allowed methods: {OPT_METHODS}")
+    t0 = perf_counter()
+
+    fun = _Objective(function, inp_dict, x_names, y_name, sign, store, settings.get('rtol', 1e-12), values)
+    if method == 'nelder-mead':
+        x, y, conv, count, size = _nelder_mead(fun, x_0, delta, x_min, x_max, xtol, ftol, count_max, DEBUG)
+    else:
+        x, y, conv, count, size = _pattern(fun, x_0, delta, x_min, x_max, xtol, delta_scaler, count_max, DEBUG)
+    "copies of the snapshots: the evaluation cache can be shared by other solves"
+    res = fun.restore(x)
+    return ConvergenceResult(x, sign * y, conv, count, fun.evaluations, fun.hits, perf_counter() - t0,
+                             delta=size, inp_dict=inp_dict, res=res)
+
+def _final_printout(result, x_names, y_name):
+    s = "Optimum found!" if result.conv else "Optimum not reached!"
+    s += f"\n\tIterations: {result.count} - Evaluations: {result.evaluations} - Cache hits: {result.cache_hits}"
+    for name, x_i in zip(x_names, result.x):
+        s += f"\n{name} = {x_i:.4f}"
+    s += f"\n{y_name} = {result.y:.6g}"
+    print(s)
+
+@timed()
+def opt_function_dict(settings, function, inp_dict):
+    """
+    Derivative-free minimization (or maximization) of an output of the function dictionary (both input and output):
+    several independent variables are varied together within their bounds.
+    - settings:
+        - 'x_names': list[str], independent variable names (i.e. dictionary keys)
+        - 'x_0': list[float], initial values of the independent variables (required, finite)
+        - 'x_min': list[float], [opt.] minimum allowed values for independent variables (None allowed)
+        - 'x_max': list[float], [opt.] maximum allowed values for independent variables (None allowed)
+        - 'y_name': str, output variable to be minimized (i.e. dictionary key)
+        - 'maximize': bool, default=False, the output variable is maximized
+        - 'method': str, default='nelder-mead', optimization method:
+            - 'nelder-mead': Nelder-Mead simplex, trial points projected into the bounds
+            - 'pattern': pattern search (Hooke-Jeeves), steps divided by delta_scaler when no improvement is found
+        - 'delta': float or list[float], default=5% of x_0, initial simplex size / pattern step of each variable
+        - 'delta_scaler': float, default=2, step reduction factor of the 'pattern' method
+        - 'xtol': float or list[float], default=1e-4, tolerance of the variables (simplex size / pattern step)
+        - 'ftol': float, default=1e-6, tolerance of the output variable (simplex spread, 'nelder-mead' only)
+        - 'count_max': int, default=200*len(x_names), maximum number of iterations
+        - 'rtol': float, default=1e-12, relative tolerance of the keys of the shared store (see multistart)
+        - 'DEBUG': bool, enables debugging printouts
+        - 'printout': print final result
+        - 'result': bool, default=False, a ConvergenceResult is returned (y is the optimum output value)
+    - function: function taking the input dictionary and returning the output dictionary (same contract of
+                nc_function_dict models, e.g. a model solving its own nc_function_dict internally)
+    - inp_dict: dict, input dictionary, the independent variables are set into it
+    The function is evaluated only once for each x (per-solve evaluation cache of the output snapshots).
+    Return
+    - inp_dict: dict, input dictionary at the optimum (including the fields written by the function at the optimum)
+    - res: dict, function output at the optimum
+    """
+    result = _opt_dict(settings, function, inp_dict)
+    if settings.get('printout', False):
+        _final_printout(result, settings.get('x_names'), settings.get('y_name'))
+    if settings.get('result', False):
+        return result
+    return result.inp_dict, result.res
+
+def _opt_start(settings, function, inp_dict, x_0, store, values=None):
+    """
+    Worker of opt_function_dict_multistart: local optimization from x_0, the errors are captured.
+    Return
+    - result: ConvergenceResult, None if an error occurred
+    - error: str, None if no error occurred
+    """
+    import traceback
+    try:
+        return _opt_dict({**settings, 'x_0': x_0}, function, deepcopy(inp_dict), store, values), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}\n{traceback.format_exc()}"
+
+def _start_points(settings, n, x_min, x_max):
+    "starting points: given list, or Latin hypercube sampling of the bounds (first point replaced by x_0)"
+    if settings.get('x_0s') is not None:
+        return [list(map(float, x)) for x in settings['x_0s']]
+    starts = settings.get('starts', 10)
+    if not (np.all(np.isfinite(x_min)) and np.all(np.isfinite(x_max))):
+        raise ValueError("Finite 'x_min' and 'x_max' are required to sample the starting points (or give 'x_0s')")
+    rng = np.random.default_rng(settings.get('seed'))
+    u = (np.array([rng.permutation(starts) for _ in range(n)]).T + rng.random((starts, n))) / starts
+    points = (x_min + u * (x_max - x_min)).tolist()
+    if settings.get('x_0') is not None:
+        points[0] = list(map(float, settings['x_0']))
+    return points
+
+@timed()
+def opt_function_dict_multistart(settings, function, inp_dict, max_workers=None):
+    """
+    Multistart optimization: opt_function_dict run from several starting points spread across a process pool,
+    the evaluations are shared by the starts (sqlite store, a point already evaluated by a start is not
+    recomputed), the pending starts are cancelled when the same optimum has been found by 'same_count' starts.
+    - settings: dict, opt_function_dict settings, additional keys:
+        - 'starts': int, default=10, number of starting points sampled in the bounds (Latin hypercube)
+        - 'x_0s': list[list[float]], default=None, starting points (instead of the sampled ones)
+        - 'seed': int, default=None, seed of the sampling
+        - 'same_tol': float, default=1e-3, two optima are the same when the distance of each variable,
+                      relative to the bounds range (or the value if unbounded), is within same_tol
+        - 'same_count': int, default=3, early stop when the best optimum has been found by same_count starts
+                        (None: all the starts are run)
+        - 'store': str, default=None, sqlite file of the shared evaluations (a temporary file if None, the
+                   starts share an in-memory cache in the serial run), an existing store is reused
+                   (e.g. previous runs of the same model). The store is keyed by the repr of the inputs: the
+                   input values must have a value based repr (TypeError for '<... at 0x...>', see memoize)
+    - function: function of opt_function_dict, it must be picklable (i.e. defined at module level)
+    - inp_dict: dict, input dictionary, each start works on its own copy
+    - max_workers: int, default=None, number of processes (None: number of CPUs, 1: serial run in this process)
+    Return
+    - inp_dict, res: dict, input dictionary and function output at the best optimum, or, if settings['result']
+      is True, list[ConvergenceResult] of the completed starts sorted from the best one
+    """
+    import os
+    import shutil
+    import tempfile
+    x_names = settings.get('x_names')
+    n = len(x_names)
+    x_min = _as_array(settings.get('x_min'), n, -np.inf)
+    x_max = _as_array(settings.get('x_max'), n, np.inf)
+    same_tol = settings.get('same_tol', 1e-3)
+    same_count = settings.get('same_count', 3)
+    sign = -1. if settings.get('maximize', False) else 1.
+    DEBUG = settings.get('DEBUG', False)
+    points = _start_points(settings, n, x_min, x_max)
+    scale = np.where(np.isfinite(x_max - x_min), x_max - x_min, 0.)
+    local = {k: v for k, v in settings.items() if k not in ['printout', 'result', 'DEBUG']}
+
+    store = settings.get('store')
+    tmp_dir = None
+    if store is None and max_workers != 1:
+        tmp_dir = tempfile.mkdtemp(prefix='opt_')
+        store = os.path.join(tmp_dir, 'evaluations.sqlite')
+
+    results, errors = [], []
+
+    def collect(result, error):
+        "True when the best optimum has been found by same_count starts"
+        if error is not None:
+            errors.append(error)
+            if DEBUG:
+                print(error)
+            return False
+        results.append(result)
+        if DEBUG:
+            print(f"start {len(results)}: y = {result.y:.6g} - x = {result.x} - evaluations = {result.evaluations}")
+        if same_count is None:
+            return False
+        best = min(results, key=lambda r: sign * r.y)
+        s = np.where(scale > 0, scale, np.maximum(np.abs(best.x), 1.))
+        same = sum(np.all(np.abs(r.x - best.x) <= same_tol * s) for r in results)
+        return same >= same_count
+
+    try:
+        if max_workers == 1:
+            values = {} # same process: the starts share the evaluation cache
+            for x_0 in points:
+                if collect(*_opt_start(local, function, inp_dict, x_0, store, values)):
+                    break
+        else:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_opt_start, local, function, inp_dict, x_0, store) for x_0 in points]
+                for future in as_completed(futures):
+                    if collect(*future.result()):
+                        for f in futures:
+                            f.cancel() # starts not begun yet, the running ones are completed
+                        break
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    if not results:
+        raise RuntimeError(f"All the starts failed, first error:\n{errors[0] if errors else 'no starting points'}")
+    results.sort(key=lambda r: sign * r.y)
+    best = results[0]
+    if settings.get('printout', False):
+        print(f"Starts completed: {len(results)}/{len(points)} - Errors: {len(errors)} - "
+              f"Evaluations: {sum(r.evaluations for r in results)} - Cache hits: {sum(r.cache_hits for r in results)}")
+        _final_printout(best, x_names, settings.get('y_name'))
+    if settings.get('result', False):
+        return results
+    return best.inp_dict, best.res
@@ -0,0 +1,40 @@
+"""
+Engineering Numerical Methods: lazy public surface (PEP 562).
+The modules are imported at the first access of one of their names, e.g. `from obj import nc_function_dict`
+does not load CoolProp or matplotlib, `obj.ph_diagram` loads coolprop_utils only when used.
+"""
+import importlib
+
+_LAZY = {
+    'obj.numerical_convergence': ['NC_METHODS', 'ConvergenceResult', 'ConvergenceTrace', 'NcContinuation',
+                                  'nc_function_args', 'nc_function_dict', 'nc_function_dict_sweep',
+                                  'nc_function_args_async', 'nc_function_dict_async', 'nc_gather_async',
+                                  'nc_function_args_batch'],
+    'obj.coolprop_utils': ['PropsSI', 'critical_point', 'calc_h', 'calc_h_batch', 'PropertyTable',
+                           'register_mixture', 'get_state', 'fluid_constant', 'saturation_dome',
+                           'ph_diagram', 'ph_diagram_batch', 'R513a', 'R515b'],
+    'obj.table_printout': ['build_table', 'build_table_columns', 'write_table', 'print_table_vert', 'print_table_horiz',
+                           'TablePrintout'],
+    'obj.decorators': ['timing', 'memoize'],
+    'obj.instrumentation': ['timed', 'timer', 'timer_stats'],
+    'obj.benchmark': ['benchmark', 'run_suite'],
+    'obj.utils': ['LazyModule', 'curve_intersection', 'print_table', 'print_dictionary_tree'],
+    'obj.EquationSystems.NonLinearEquations.nonlinear_equations': ['NC_SYSTEM_METHODS', 'nc_system_dict'],
+    'obj.EquationSystems.LinearEquations.linear_equations': ['LUFactor', 'TridiagonalFactor', 'BandedFactor', 'thomas'],
+    'obj.NumericalSolver.InitialValues.initial_values': ['IVP_STATUS', 'IvpResult', 'ivp_batch'],
+    'obj.Optimization.optimization': ['OPT_METHODS', 'opt_function_dict', 'opt_function_dict_multistart'],
+    'obj.DataManipulation.Interpolation.interpolation': ['Interp1D', 'Interp2D'],
+}
+_NAMES = {name: module for module, names in _LAZY.items() for name in names}
+
+__all__ = list(_NAMES)
+
+def __getattr__(name:str):
+    if name not in _NAMES:
+        raise AttributeError(f"module 'obj' has no attribute '{name}'")
+    value = getattr(importlib.import_module(_NAMES[name]), name)
+    globals()[name] = value # next accesses skip __getattr__
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
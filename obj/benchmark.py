@@ -0,0 +1,140 @@
+from time import perf_counter_ns
+from statistics import median, mean, stdev, quantiles
+import platform
+import json
+import os
+import gc
+
+"""
+Benchmark runner: warmup, repeated runs and statistical summaries of the execution time, JSON baselines and
+regression flags, for the timing comparisons of the methods (see Development Guidelines).
+"""
+
+def _summary(times:list[float]) -> dict:
+    "Statistics of the run times [s]."
+    q1, _, q3 = quantiles(times, n=4, method='inclusive') if len(times) > 1 else (times[0], None, times[0])
+    return {'median': median(times), 'mean': mean(times), 'stdev': stdev(times) if len(times) > 1 else 0.,
+            'min': min(times), 'max': max(times), 'q1': q1, 'q3': q3, 'iqr': q3 - q1, 'repeat': len(times)}
+
+def benchmark(function, args:tuple=(), setup=None, warmup:int=1, repeat:int=7, number:int=1, info=None) -> dict:
+    """
+    Execution time of a function call, repeated runs after the warmup runs (garbage collector disabled while timing).
+    - function: callable, function to be timed
+    - args: tuple, default=(), function arguments
+    - setup: callable, default=None, called before each run (not timed), its output replaces args if not None
+             (e.g. fresh inputs for functions modifying them)
+    - warmup: int, default=1, runs not measured (caches, lazy imports)
+    - repeat: int, default=7, measured runs
+    - number: int, default=1, calls of each run, the time of a run is divided by number
+    - info: callable, default=None, info(output) -> dict, additional values of the last output (e.g. evaluations)
+    Return
+    - stats: dict, 'median', 'mean', 'stdev', 'min', 'max', 'q1', 'q3', 'iqr' [s], 'repeat', 'number', 'info'
+    """
+    def run():
+        inp = setup() if setup is not None else None
+        inp = args if inp is None else inp
+        t0 = perf_counter_ns()
+        for _ in range(number):
+            out = function(*inp)
+        return (perf_counter_ns() - t0) * 1e-9 / number, out
+
+    for _ in range(warmup):
+        run()
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        runs = [run() for _ in range(repeat)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    stats = _summary([t for t, _ in runs])
+    stats['number'] = number
+    stats['info'] = info(runs[-1][1]) if info is not None else {}
+    return stats
+
+def run_suite(cases:dict, settings:dict={}) -> dict:
+    """
+    Benchmark of multiple cases.
+    - cases: dict, {name: case}, case dict with the benchmark arguments: "function" (required), "args",
+             "setup", "number", "info", and optionally "warmup", "repeat" overriding the settings
+    - settings: dict, default={}
+        - "warmup": int, default=1, see benchmark
+        - "repeat": int, default=7, see benchmark
+        - "filter": str, default=None, only the cases with the name containing the string
+        - "printout": bool, default=True, printout of each case when completed
+    Return
+    - results: dict, {name: stats}
+    """
+    results = {}
+    for name, case in cases.items():
+        if settings.get('filter') and settings['filter'] not in name:
+            continue
+        results[name] = benchmark(case['function'], case.get('args', ()), case.get('setup'),
+                                  case.get('warmup', settings.get('warmup', 1)), case.get('repeat', settings.get('repeat', 7)),
+                                  case.get('number', 1), case.get('info'))
+        if settings.get('printout', True):
+            print(f"{name:<45} {results[name]['median']*1e3:10.4f} ms  (iqr {results[name]['iqr']*1e3:.4f} ms)")
+    return results
+
+def save_results(results:dict, filepath:str):
+    """
+    Save the results as JSON baseline, with the platform description.
+    - results: dict, see run_suite
+    - filepath: str, JSON file path (folders created if not existing)
+    """
+    folder = os.path.dirname(filepath)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    data = {'platform': {'python': platform.python_version(), 'machine': platform.machine(),
+                         'system': platform.system(), 'processor': platform.processor()},
+            'results': results}
+    with open(filepath, 'w') as f:
+        json.dump(data, f, indent=2)
+
+def load_results(filepath:str) -> dict:
+    "Results of a JSON baseline (see save_results)."
+    with open(filepath) as f:
+        return json.load(f)['results']
+
+def compare(results:dict, baseline:dict, tolerance:float=1.2) -> dict:
+    """
+    Comparison of the results with a baseline, by median.
+    A case is a regression when the median ratio exceeds the tolerance and the interquartile ranges do not
+    overlap (q1 of the results above q3 of the baseline), i.e. the slowdown is not due to the noise.
+    - results: dict, see run_suite
+    - baseline: dict, baseline results (see load_results)
+    - tolerance: float, default=1.2, allowed ratio between the medians
+    Return
+    - comparison: dict, {name: {'ratio': median ratio, 'regression': bool}} for the cases in both
+    """
+    comparison = {}
+    for name, res in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        ratio = res['median'] / base['median'] if base['median'] > 0 else float('inf')
+        comparison[name] = {'ratio': ratio, 'regression': ratio > tolerance and res['q1'] > base['q3']}
+    return comparison
+
+def report(results:dict, comparison:dict=None, settings:dict={}):
+    """
+    Report of the results through table_printout.
+    - results: dict, see run_suite
+    - comparison: dict, default=None, see compare
+    - settings: dict, default={}, TablePrintout settings (e.g. "printout", "export", "markdown")
+    Return
+    - table: TablePrintout, .table is the report formatted as string
+    """
+    from obj.table_printout import TablePrintout
+    headers = ["case", "median [ms]", "min [ms]", "iqr [ms]", "repeat", "info"]
+    if comparison is not None:
+        headers += ["ratio", "regression"]
+    records = []
+    for name, res in results.items():
+        info = ", ".join(f"{k}={v}" for k, v in res.get('info', {}).items())
+        rec = [name, f"{res['median']*1e3:.4f}", f"{res['min']*1e3:.4f}", f"{res['iqr']*1e3:.4f}", res['repeat'], info]
+        if comparison is not None:
+            c = comparison.get(name)
+            rec += ["-", "-"] if c is None else [f"{c['ratio']:.2f}", "YES" if c['regression'] else ""]
+        records.append(rec)
+    return TablePrintout(headers, records, settings)
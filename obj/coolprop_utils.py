@@ -1,6 +1,19 @@
-from CoolProp.CoolProp import PropsSI
-import CoolProp.CoolProp as CP
-import matplotlib.pyplot as plt
+from obj.utils import LazyModule
+from obj.instrumentation import timed
+import threading
+import json
+import os
+import re
+
+"numpy, CoolProp and matplotlib are loaded at the first use (short-lived workers, headless nodes)"
+np = LazyModule('numpy')
+CP = LazyModule('CoolProp.CoolProp')
+plt = LazyModule('matplotlib.pyplot')
+mpimg = LazyModule('matplotlib.image')
+
+def PropsSI(*args):
+    "CoolProp PropsSI (see CoolProp documentation)"
+    return CP.PropsSI(*args)
 
 """
 NOTE: measurement unit used at the interface with these functions
@@ -33,6 +46,7 @@ def critical_point(ref:str):
     print(f"P Crit: {PropsSI('Pcrit', ref) / 1e5:2f} bar")
     print(f"T Crit: {PropsSI('Tcrit', ref) - 273.15:2f} degC")
 
+@timed()
 def calc_h(point:list, ref:str):
     """
     Calculation of enthalpy given a point
@@ -67,6 +81,398 @@ def calc_h(point:list, ref:str):
     # print(p, t, h) # DEBUG
     return p, t, x, h
 
+def _parse_fluid(ref:str):
+    """
+    Split of a CoolProp fluid string, e.g. 'HEOS::R1234yf[0.56]&R134a[0.44]'.
+    - ref: str, refrigerant id for CoolProp
+    Return
+    - backend: str, CoolProp backend, default='HEOS'
+    - fluids: str, fluid names joined by '&'
+    - fractions: list[float], mole fractions (empty list for pure fluids)
+    """
+    backend = 'HEOS'
+    if '::' in ref:
+        backend, ref = ref.split('::', 1)
+    names, fractions = [], []
+    for component in ref.split('&'):
+        if '[' in component:
+            name, fraction = component.rstrip(']').split('[')
+            names.append(name)
+            fractions.append(float(fraction))
+        else:
+            names.append(component)
+    return backend, '&'.join(names), fractions
+
+def _abstract_state(ref:str, backend:str=None):
+    """
+    CoolProp low-level AbstractState of the given fluid string (mole fractions set for mixtures).
+    - ref: str, refrigerant id for CoolProp
+    - backend: str, default=None, backend used instead of the one of the fluid string (e.g. 'BICUBIC&HEOS')
+    """
+    ref_backend, fluids, fractions = _parse_fluid(ref)
+    state = CP.AbstractState(ref_backend if backend is None else backend, fluids)
+    if fractions:
+        state.set_mole_fractions(fractions)
+    return state
+
+"Fluid registry: mixing rules applied once per process, cached constants, thread-local pooled AbstractStates"
+_MIXTURES = {}
+_MIXING_RULES = set()
+_CONSTANTS = {}
+_STATE_POOL = threading.local()
+
+def register_mixture(name:str, components:dict, rule:str='linear') -> str:
+    """
+    Register a mixture once per process: the mixing rule of each binary pair is applied only at the first call.
+    - name: str, mixture name used as key of the registry (e.g. 'R513a')
+    - components: dict, {fluid name: mole fraction}
+    - rule: str, default='linear', CoolProp simple mixing rule ('linear' or 'Lorentz-Berthelot')
+    Return
+    - ref: str, CoolProp fluid string of the mixture (e.g. 'R1234yf[0.56]&R134a[0.44]')
+    """
+    if name in _MIXTURES:
+        return _MIXTURES[name]
+    names = list(components)
+    for i, name_i in enumerate(names):
+        for name_j in names[i+1:]:
+            pair = tuple(sorted([name_i, name_j])) + (rule,)
+            if pair in _MIXING_RULES:
+                continue
+            cas_i = CP.get_fluid_param_string(name_i, 'CAS')
+            cas_j = CP.get_fluid_param_string(name_j, 'CAS')
+            try:
+                CP.apply_simple_mixing_rule(cas_i, cas_j, rule)
+            except ValueError:
+                pass # pair already into the binary interaction library
+            _MIXING_RULES.add(pair)
+    _MIXTURES[name] = '&'.join(f"{n}[{f}]" for n, f in components.items())
+    return _MIXTURES[name]
+
+def get_state(ref:str, backend:str=None):
+    """
+    Pooled CoolProp AbstractState of the fluid, one instance per (ref, backend) in each thread.
+    The state is shared by the callers of the same thread: update it before every use.
+    - ref: str, refrigerant id for CoolProp (or name of a registered mixture)
+    - backend: str, default=None, backend used instead of the one of the fluid string (e.g. 'BICUBIC&HEOS')
+    """
+    ref = _MIXTURES.get(ref, ref)
+    if not hasattr(_STATE_POOL, 'states'):
+        _STATE_POOL.states = {}
+    key = (ref, backend)
+    if key not in _STATE_POOL.states:
+        _STATE_POOL.states[key] = _abstract_state(ref, backend)
+    return _STATE_POOL.states[key]
+
+def fluid_constant(ref:str, key:str) -> float:
+    """
+    Cached fluid constant, computed once per process.
+    - ref: str, refrigerant id for CoolProp (or name of a registered mixture)
+    - key: str, 'Pcrit' [Pa] or 'Tcrit' [K]
+    For mixtures the critical point is the first stable one found by CoolProp (PropsSI does not support them).
+    """
+    if key not in ['Pcrit', 'Tcrit']:
+        raise ValueError(f"Constant '{key}' not available, allowed constants: ['Pcrit', 'Tcrit']")
+    ref = _MIXTURES.get(ref, ref)
+    if (ref, key) not in _CONSTANTS:
+        state = get_state(ref)
+        if _parse_fluid(ref)[2]:
+            points = [point for point in state.all_critical_points() if point.stable] or state.all_critical_points()
+            pcrit, tcrit = points[0].p, points[0].T
+        else:
+            pcrit, tcrit = state.p_critical(), state.T_critical()
+        _CONSTANTS[(ref, 'Pcrit')] = pcrit
+        _CONSTANTS[(ref, 'Tcrit')] = tcrit
+    return _CONSTANTS[(ref, key)]
+
+@timed()
+def calc_h_batch(p, t, x, ref:str):
+    """
+    Vectorized calculation of enthalpy given arrays of points, NaN for the unknown values.
+    The points are grouped by the known inputs and evaluated through a reused CoolProp AbstractState.
+    - p: array-like, relative pressure [barg]
+    - t: array-like, temperature [degC]
+    - x: array-like, vapour quality [0-1]
+    - ref: str, refrigerant id for CoolProp
+    Return (arrays with the broadcast shape of the inputs, NaN where the point is not well
+    defined or cannot be evaluated)
+    - p: array, absolute pressure [bar]
+    - t: array, temperature [degC]
+    - x: array, quality [0-1] (-1 for single phase points, as PropsSI)
+    - h: array, specific enthalpy [J/kg/K]
+    """
+    p, t, x = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(t, dtype=float), np.asarray(x, dtype=float))
+    shape = p.shape
+    p = p.flatten() + 1 # from relative to absolute pressure
+    t = t.flatten()
+    x = x.flatten()
+    h = np.full(p.shape, np.nan)
+    known_p, known_t, known_x = ~np.isnan(p), ~np.isnan(t), ~np.isnan(x)
+    state = get_state(ref)
+
+    "p, t known"
+    for i in np.flatnonzero(known_p & known_t):
+        try:
+            state.update(CP.PT_INPUTS, p[i] * 1e5, t[i] + 273.15)
+            h[i], x[i] = state.hmass(), state.Q()
+        except ValueError:
+            x[i] = np.nan
+    "t, x known"
+    for i in np.flatnonzero(~known_p & known_t & known_x):
+        try:
+            state.update(CP.QT_INPUTS, x[i], t[i] + 273.15)
+            h[i], p[i] = state.hmass(), state.p() * 1e-5
+        except ValueError:
+            pass
+    "p, x known"
+    for i in np.flatnonzero(known_p & ~known_t & known_x):
+        try:
+            state.update(CP.PQ_INPUTS, p[i] * 1e5, x[i])
+            h[i], t[i] = state.hmass(), state.T() - 273.15
+        except ValueError:
+            pass
+    return p.reshape(shape), t.reshape(shape), x.reshape(shape), h.reshape(shape)
+
+class PropertyTable:
+    def __init__(self, ref:str, p_range:list, y_range:list, inputs:str="ph", outputs:list=["T", "Dmass", "Smass"],
+                 n:list=[200, 200], backend:str="numpy", build:bool=True):
+        """
+        Property lookup table of a fluid in a bounded region, for fast vectorized evaluations in sweeps.
+        The table is a regular grid (log-spaced pressure) interpolated bilinearly, or a CoolProp tabular backend.
+        - ref: str, refrigerant id for CoolProp
+        - p_range: list[float], [min, max] absolute pressure [bar]
+        - y_range: list[float], [min, max] of the second input, specific enthalpy [J/kg] or temperature [degC]
+        - inputs: str, default="ph", table inputs, "ph" (pressure-enthalpy) or "pt" (pressure-temperature)
+        - outputs: list[str], default=["T", "Dmass", "Smass"], CoolProp output keys, SI units except "T" [degC] and "P" [bar]
+        - n: list[int], default=[200, 200], grid points for pressure and second input
+        - backend: str, default="numpy"
+            - "numpy": native numpy grid, bilinear interpolation, it can be saved as .npy files
+            - "TTSE", "BICUBIC": CoolProp tabular backends (no grid is built here), evaluated point by point
+              (no vectorized CoolProp API): about 1.3 us for each point (R134a, "ph"), most of it by keyed_output
+        - build: bool, default=True, build the grid at initialization (False when loaded from files)
+        Points outside the region or where CoolProp fails (e.g. inside the saturation dome with "pt" inputs) are NaN.
+        """
+        if inputs not in ["ph", "pt"]:
+            raise ValueError(f"Inputs '{inputs}' not available, allowed inputs: ['ph', 'pt']")
+        if backend not in ["numpy", "TTSE", "BICUBIC"]:
+            raise ValueError(f"Backend '{backend}' not available, allowed backends: ['numpy', 'TTSE', 'BICUBIC']")
+        self.ref = ref
+        self.p_range = [float(v) for v in p_range]
+        self.y_range = [float(v) for v in y_range]
+        self.inputs = inputs
+        self.outputs = list(outputs)
+        self.n = [int(v) for v in n]
+        self.backend = backend
+        self.log_p = np.linspace(np.log(self.p_range[0]), np.log(self.p_range[1]), self.n[0])
+        self.y = np.linspace(self.y_range[0], self.y_range[1], self.n[1])
+        self.values = {}
+        if backend == "numpy" and build:
+            self.build()
+
+    def _state(self, backend:str=None):
+        if backend is None and self.backend in ["TTSE", "BICUBIC"]:
+            backend = f"{self.backend}&HEOS"
+        return get_state(self.ref, backend)
+
+    def _evaluate(self, state, p, y) -> dict:
+        """
+        Evaluation of the outputs at the points (p [bar], y) with the given AbstractState.
+        CoolProp has no vectorized low-level update: one update for each point (plus one keyed_output for each
+        output) is called from Python, the loop is kept lean (Python floats, bound methods, input pair solved once).
+        """
+        keys = [CP.get_parameter_index(o) for o in self.outputs]
+        nan = (float('nan'),) * len(keys)
+        update, keyed_output = state.update, state.keyed_output
+        if self.inputs == "ph":
+            pair, args = CP.HmassP_INPUTS, zip(y.tolist(), (p * 1e5).tolist())
+        else:
+            pair, args = CP.PT_INPUTS, zip((p * 1e5).tolist(), (y + 273.15).tolist())
+        rows = []
+        for a, b in args:
+            try:
+                update(pair, a, b)
+                rows.append(tuple([keyed_output(k) for k in keys]))
+            except ValueError:
+                rows.append(nan)
+        values = np.array(rows, dtype=float).reshape(-1, len(keys)).T
+        values = {o: v for o, v in zip(self.outputs, values)}
+        if "T" in values:
+            values["T"] = values["T"] - 273.15
+        if "P" in values:
+            values["P"] = values["P"] * 1e-5
+        return values
+
+    def build(self):
+        "Evaluation of the outputs on the whole grid (full equation of state)."
+        p, y = np.meshgrid(np.exp(self.log_p), self.y, indexing='ij')
+        values = self._evaluate(self._state("HEOS"), p.ravel(), y.ravel())
+        self.values = {o: v.reshape(self.n) for o, v in values.items()}
+
+    def __call__(self, p, y, outputs:list=None) -> dict:
+        """
+        Vectorized lookup.
+        - p: array-like, absolute pressure [bar]
+        - y: array-like, specific enthalpy [J/kg] or temperature [degC] (see inputs)
+        - outputs: list[str], default=None, outputs to be returned, all the table outputs if None
+        Return
+        - values: dict[str: array], the outputs with the broadcast shape of p and y (float for scalar queries)
+        """
+        outputs = self.outputs if outputs is None else outputs
+        p, y = np.broadcast_arrays(np.asarray(p, dtype=float), np.asarray(y, dtype=float))
+        shape = p.shape
+        "1D arrays for the lookup (scalar queries included), reshaped to the query shape on return"
+        p, y = p.ravel(), y.ravel()
+        if self.backend != "numpy":
+            values = self._evaluate(self._state(), p, y)
+            return {o: values[o].reshape(shape)[()] for o in outputs}
+        "fractional grid indices, O(1) on the regular grid"
+        u = (np.log(p) - self.log_p[0]) / (self.log_p[1] - self.log_p[0])
+        v = (y - self.y[0]) / (self.y[1] - self.y[0])
+        outside = (u < 0) | (u > self.n[0] - 1) | (v < 0) | (v > self.n[1] - 1) | np.isnan(u) | np.isnan(v)
+        u = np.clip(np.nan_to_num(u), 0, self.n[0] - 1)
+        v = np.clip(np.nan_to_num(v), 0, self.n[1] - 1)
+        i = np.minimum(u.astype(int), self.n[0] - 2)
+        j = np.minimum(v.astype(int), self.n[1] - 2)
+        u -= i
+        v -= j
+        values = {}
+        for o in outputs:
+            z = self.values[o]
+            values[o] = ((1 - u) * (1 - v) * z[i, j] + u * (1 - v) * z[i + 1, j]
+                         + (1 - u) * v * z[i, j + 1] + u * v * z[i + 1, j + 1])
+            values[o][outside] = np.nan
+            values[o] = values[o].reshape(shape)[()]
+        return values
+
+    def error_report(self, n_points:int=1000, seed:int=0, printout:bool=True) -> dict:
+        """
+        Interpolation error against the direct CoolProp evaluation at random points of the region.
+        - n_points: int, default=1000, number of random points
+        - seed: int, default=0, random generator seed
+        - printout: bool, default=True, print the report
+        Return
+        - report: dict[str: dict], for each output 'max_abs', 'max_rel', 'mean_rel' errors
+        """
+        rng = np.random.default_rng(seed)
+        p = np.exp(rng.uniform(self.log_p[0], self.log_p[-1], n_points))
+        y = rng.uniform(self.y[0], self.y[-1], n_points)
+        exact = self._evaluate(self._state("HEOS"), p, y)
+        table = self(p, y)
+        report = {}
+        for o in self.outputs:
+            err = np.abs(table[o] - exact[o])
+            valid = ~np.isnan(err)
+            rel = err[valid] / np.maximum(np.abs(exact[o][valid]), 1e-12)
+            report[o] = {'max_abs': float(err[valid].max()) if valid.any() else np.nan,
+                         'max_rel': float(rel.max()) if valid.any() else np.nan,
+                         'mean_rel': float(rel.mean()) if valid.any() else np.nan}
+            if printout:
+                print(f"{o}: max abs {report[o]['max_abs']:.4g} - max rel {report[o]['max_rel']:.4g} "
+                      f"- mean rel {report[o]['mean_rel']:.4g} ({valid.sum()}/{n_points} points)")
+        return report
+
+    def save(self, folder:str):
+        """
+        Export of the table to a folder: one .npy file for each output and a json file with the table definition.
+        - folder: str, destination folder (created if not existing)
+        """
+        os.makedirs(folder, exist_ok=True)
+        meta = {'ref': self.ref, 'p_range': self.p_range, 'y_range': self.y_range, 'inputs': self.inputs,
+                'outputs': self.outputs, 'n': self.n, 'backend': self.backend}
+        with open(os.path.join(folder, "table.json"), "w") as f:
+            json.dump(meta, f)
+        for o, v in self.values.items():
+            np.save(os.path.join(folder, f"{o}.npy"), v)
+
+    @classmethod
+    def load(cls, folder:str, mmap:bool=True):
+        """
+        Import of a table exported by save.
+        - folder: str, folder of the exported table
+        - mmap: bool, default=True, the arrays are memory-mapped (read-only), i.e. shared by the worker processes
+        """
+        with open(os.path.join(folder, "table.json")) as f:
+            meta = json.load(f)
+        table = cls(**meta, build=False)
+        mmap_mode = 'r' if mmap else None
+        table.values = {o: np.load(os.path.join(folder, f"{o}.npy"), mmap_mode=mmap_mode)
+                        for o in table.outputs if os.path.exists(os.path.join(folder, f"{o}.npy"))}
+        return table
+
+_SATURATION_DOMES = {} # in-memory cache of the saturation domes
+
+def _saturation_h(state, p):
+    "saturated liquid and vapour enthalpy at pressure p [Pa], NaN if not available"
+    h = []
+    for q in [0, 1]:
+        try:
+            state.update(CP.PQ_INPUTS, p, q)
+            h.append(state.hmass())
+        except ValueError:
+            h.append(np.nan)
+    return h
+
+def saturation_dome(ref:str, pcrit:float=None, tcrit:float=None, n:int=101, spacing:str="log", folder:str=None):
+    """
+    Saturation dome of the refrigerant (saturated liquid and vapour curves), cached in memory
+    and optionally on disk: the dome is computed once for each (ref, pcrit, tcrit, n, spacing).
+    - ref: str, refrigerant id for CoolProp
+    - pcrit: float, default=None, critical pressure value, used instead of the value into the library [Pa]
+    - tcrit: float, default=None, critical temperature value, used instead of the value into the library [K]
+    - n: int, default=101, number of pressure values
+    - spacing: str, default="log", pressure sampling from pcrit/100 to pcrit
+        - "linear": uniform spacing
+        - "log": logarithmic spacing, i.e. uniform on the log-scale ph diagram
+        - "adaptive": log-spaced coarse sampling refined where the curves bend (near the critical point)
+    - folder: str, default=None, folder of the disk cache (.npy files), disk cache disabled if None
+    Return
+    - p: array, absolute pressure [bar]
+    - h_liq: array, saturated liquid specific enthalpy [J/kg/K]
+    - h_vap: array, saturated vapour specific enthalpy [J/kg/K]
+    """
+    if spacing not in ["linear", "log", "adaptive"]:
+        raise ValueError(f"Spacing '{spacing}' not available, allowed spacings: ['linear', 'log', 'adaptive']")
+    pcrit = fluid_constant(ref, 'Pcrit') if pcrit is None else pcrit
+    tcrit = fluid_constant(ref, 'Tcrit') if tcrit is None else tcrit
+    key = (ref, float(pcrit), float(tcrit), n, spacing)
+    if key in _SATURATION_DOMES:
+        return _SATURATION_DOMES[key]
+    filepath = None
+    if folder is not None:
+        "file name from the in-memory key (full precision of the critical values): one file for each key"
+        filename = re.sub(r'[^\w.-]', '_', "dome_" + "_".join(map(str, key))) + ".npy"
+        filepath = os.path.join(folder, filename)
+        if os.path.exists(filepath):
+            _SATURATION_DOMES[key] = tuple(np.load(filepath))
+            return _SATURATION_DOMES[key]
+
+    state = get_state(ref)
+    p_min = pcrit / 100
+    if spacing == "linear":
+        p = np.linspace(p_min, pcrit, n)
+    elif spacing == "log":
+        p = np.geomspace(p_min, pcrit, n)
+    else:
+        p = np.geomspace(p_min, pcrit, max(n // 4, 2))
+    h = np.array([_saturation_h(state, p_i) for p_i in p])
+    if spacing == "adaptive":
+        "the segment with the longest normalized arc length (log p, h) is split until n points"
+        while p.size < n:
+            valid = ~np.isnan(h)
+            h_range = np.nanmax(h) - np.nanmin(h)
+            d_log_p = np.diff(np.log(p)) / np.log(pcrit / p_min)
+            d_h = np.nan_to_num(np.abs(np.diff(h, axis=0)).max(axis=1) / h_range)
+            d_h[~(valid[1:].all(axis=1) & valid[:-1].all(axis=1))] = 1 # segments with missing values are refined too
+            k = np.argmax(np.hypot(d_log_p, d_h))
+            p_k = np.sqrt(p[k] * p[k + 1])
+            p = np.insert(p, k + 1, p_k)
+            h = np.insert(h, k + 1, _saturation_h(state, p_k), axis=0)
+    dome = (p * 1e-5, h[:, 0], h[:, 1])
+    _SATURATION_DOMES[key] = dome
+    if filepath is not None:
+        os.makedirs(folder, exist_ok=True)
+        np.save(filepath, np.array(dome))
+    return dome
+
 def ph_diagram(ref, points=[], pcrit=None, tcrit=None, plot_settings={}):
     """
     Drawing of a single or multiple thermodynamic cycles into the refrigerant ph diagram.
@@ -84,18 +490,18 @@ def ph_diagram(ref, points=[], pcrit=None, tcrit=None, plot_settings={}):
         - "xlim": list[float], x-axis limits
         - "ylim": list[float], y-axis limits
         - "figsize": list[float], default=(12, 12), figure size
+        - "dome_points": int, default=101, number of points of the saturation curves
+        - "dome_spacing": str, default="log", pressure sampling of the saturation curves (see saturation_dome)
+        - "dome_folder": str, default=None, folder of the saturation dome disk cache
     """
-    N = 100 # number of points for saturation curves
     xlim = plot_settings.get('xlim')
     ylim = plot_settings.get('ylim')
     figsize = plot_settings.get('figsize', (12, 12))
+    dome_points = plot_settings.get('dome_points', 101)
+    dome_spacing = plot_settings.get('dome_spacing', 'log')
+    dome_folder = plot_settings.get('dome_folder')
     try:
-        pcrit = PropsSI('Pcrit', ref) if pcrit is None else pcrit
-        tcrit = PropsSI('Tcrit', ref) if tcrit is None else tcrit
-        p_vap_liq = [pcrit * (i+1)/N for i in range(N)] + [pcrit]
-        h_vap = [PropsSI('H', 'P', p, 'Q', 1, ref) for p in p_vap_liq]
-        h_liq = [PropsSI('H', 'P', p, 'Q', 0, ref) for p in p_vap_liq]
-        p_vap_liq = [p * 1e-5 for p in p_vap_liq]
+        p_vap_liq, h_liq, h_vap = saturation_dome(ref, pcrit, tcrit, dome_points, dome_spacing, dome_folder)
         figure = plt.figure(figsize=figsize)
         plt.plot(h_vap, p_vap_liq, 'k', label="vap")
         plt.plot(h_liq, p_vap_liq, 'k', label="liq")
@@ -135,24 +541,146 @@ def ph_diagram(ref, points=[], pcrit=None, tcrit=None, plot_settings={}):
     except Exception as e:
         print(f"{e}\nIssue dealing with {ref} refrigerant.")
 
+def _ph_cycles_bulk(ref:str, units:dict) -> dict:
+    """
+    Cycle points of all the units evaluated with a single calc_h_batch call (input lists are not modified).
+    - ref: str, refrigerant CoolProp id
+    - units: dict[str: list | dict], see ph_diagram_batch
+    Return
+    - lines: dict[str: list[tuple[array, array]]], for each unit the (h, p) arrays of each cycle, closed on the first point
+    """
+    cycles = [] # (unit, points of the closed cycle)
+    for unit, points in units.items():
+        for points_cycle in (points.values() if isinstance(points, dict) else [points]):
+            if len(points_cycle) > 0:
+                cycles.append((unit, list(points_cycle) + [points_cycle[0]]))
+    lines = {unit: [] for unit in units}
+    if len(cycles) == 0:
+        return lines
+    values = [[np.nan if v is None else v for v in list(point) + [None] * (3 - len(point))]
+              for _, points_cycle in cycles for point in points_cycle]
+    values = np.array(values, dtype=float)
+    p, t, x, h = calc_h_batch(values[:, 0], values[:, 1], values[:, 2], ref)
+    start = 0
+    for unit, points_cycle in cycles:
+        end = start + len(points_cycle)
+        lines[unit].append((h[start:end], p[start:end]))
+        start = end
+    return lines
+
+def _ph_filenames(units) -> dict:
+    "file name of each unit (without extension): sanitized unit name, with the unit position when names collide"
+    names = {u: re.sub(r'[^\w.-]', '_', str(u)) for u in units}
+    counts = {}
+    for name in names.values():
+        counts[name] = counts.get(name, 0) + 1
+    return {u: name if counts[name] == 1 else f"{name}_{i}" for i, (u, name) in enumerate(names.items())}
+
+def _ph_render(ref:str, dome:tuple, lines:dict, folder:str, fmt:str, plot_settings:dict, filenames:dict) -> list:
+    """
+    Rendering of the units on a single Agg figure: the saturation dome and the axes are drawn once,
+    only the cycle lines and the title are swapped for each unit.
+    - dome: tuple[array], (p, h_liq, h_vap) of saturation_dome
+    - lines: dict, see _ph_cycles_bulk
+    - filenames: dict, file name of each unit (see _ph_filenames)
+    Return
+    - filepaths: list[str], files written
+    """
+    figsize = plot_settings.get('figsize', (12, 12))
+    dpi = plot_settings.get('dpi', 100)
+    compress_level = plot_settings.get('png_compress_level', 1)
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    p_vap_liq, h_liq, h_vap = dome
+    figure = Figure(figsize=figsize, dpi=dpi)
+    canvas = FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.plot(h_vap, p_vap_liq, 'k')
+    ax.plot(h_liq, p_vap_liq, 'k')
+    ax.set_xlabel("h [J/kg/K]")
+    ax.set_ylabel("p [bar]")
+    ax.set_yscale('log')
+    ax.grid(which="both")
+    ax.set_xlim(plot_settings['xlim'])
+    ax.set_ylim(plot_settings['ylim'])
+    blit = fmt == 'png'
+    title = ax.set_title("", animated=blit)
+    n_lines = max([len(cycles) for cycles in lines.values()] + [1])
+    artists = [ax.plot([], [], '-*', animated=blit)[0] for _ in range(n_lines)]
+    canvas.draw()
+    background = canvas.copy_from_bbox(figure.bbox) if blit else None
+
+    filepaths = []
+    for unit, cycles in lines.items():
+        title.set_text(f"{ref} - {unit}")
+        for i, artist in enumerate(artists):
+            artist.set_data(*cycles[i]) if i < len(cycles) else artist.set_data([], [])
+        filepath = os.path.join(folder, filenames[unit] + f".{fmt}")
+        if blit:
+            canvas.restore_region(background)
+            for artist in artists + [title]:
+                ax.draw_artist(artist)
+            mpimg.imsave(filepath, np.asarray(canvas.buffer_rgba()), pil_kwargs={'compress_level': compress_level})
+        else:
+            figure.savefig(filepath)
+        filepaths.append(filepath)
+    return filepaths
+
+def ph_diagram_batch(ref:str, units:dict, folder:str, fmt:str="png", pcrit:float=None, tcrit:float=None,
+                     plot_settings:dict={}, max_workers:int=1) -> list:
+    """
+    Headless (Agg) rendering of many thermodynamic cycles on the refrigerant ph diagram, one file for each unit.
+    The cycle points of all the units are computed in bulk, the dome and the axes are drawn once and only the
+    cycle lines are swapped for each unit.
+    - ref: str, refrigerant CoolProp id
+    - units: dict[str: list | dict], for each unit (the file name) the points of a single cycle (list) or of
+             multiple cycles (dict), see ph_diagram. The input lists are not modified.
+    - folder: str, destination folder (created if not existing)
+    - fmt: str, default="png", file format, "png" (blitted, fastest) or any other matplotlib format (e.g. "svg")
+    - pcrit: float [opt], critical pressure value, used instead of the value into the library [Pa]
+    - tcrit: float [opt], critical temperature value, used instead of the value into the library [K]
+    - plot_settings: dict, plot customizations (see ph_diagram), plus:
+        - "dpi": int, default=100, figure resolution
+        - "png_compress_level": int, default=1, png compression level (0-9), low values are faster
+    - max_workers: int, default=1, number of processes rendering the units (None: number of CPUs)
+    Return
+    - filepaths: list[str], files written, in the order of units (the unit position is appended to the file
+                 names colliding after the sanitization, e.g. "R/1" and "R_1")
+    """
+    os.makedirs(folder, exist_ok=True)
+    dome = saturation_dome(ref, pcrit, tcrit, plot_settings.get('dome_points', 101),
+                           plot_settings.get('dome_spacing', 'log'), plot_settings.get('dome_folder'))
+    lines = _ph_cycles_bulk(ref, units)
+
+    "common axes limits for all the units"
+    plot_settings = dict(plot_settings)
+    h_all = np.concatenate([dome[1], dome[2]] + [h for cycles in lines.values() for h, _ in cycles])
+    p_all = np.concatenate([dome[0]] + [p for cycles in lines.values() for _, p in cycles])
+    h_min, h_max = np.nanmin(h_all), np.nanmax(h_all)
+    if plot_settings.get('xlim') is None:
+        plot_settings['xlim'] = [h_min - 0.05 * (h_max - h_min), h_max + 0.05 * (h_max - h_min)]
+    if plot_settings.get('ylim') is None:
+        plot_settings['ylim'] = [np.nanmin(p_all) / 1.2, np.nanmax(p_all) * 1.2]
+
+    filenames = _ph_filenames(lines)
+    max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+    if max_workers == 1 or len(lines) < 2:
+        return _ph_render(ref, dome, lines, folder, fmt, plot_settings, filenames)
+    from concurrent.futures import ProcessPoolExecutor
+    names = list(lines)
+    chunks = [chunk for chunk in (names[i::max_workers] for i in range(max_workers)) if chunk]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_ph_render, ref, dome, {u: lines[u] for u in chunk}, folder, fmt, plot_settings,
+                                   {u: filenames[u] for u in chunk})
+                   for chunk in chunks]
+        "results keyed by unit: the files of each chunk are in the order of the chunk"
+        rendered = {u: f for chunk, future in zip(chunks, futures) for u, f in zip(chunk, future.result())}
+    return [rendered[u] for u in names]
+
 def R513a():
-    "Create and return the R513a mixture to be used into PropsSI."
-    R513a = 'R1234yf[0.56]&R134a[0.44]'
-    CAS_R134a = CP.get_fluid_param_string('R134a','CAS')
-    CAS_R1234yf = CP.get_fluid_param_string('R1234yf','CAS')
-    try:
-        CP.apply_simple_mixing_rule(CAS_R134a, CAS_R1234yf, 'linear')
-    except Exception as e:
-        print(R513a, 'already added to library\n\t', e)
-    return R513a
+    "Register (once per process) and return the R513a mixture to be used into PropsSI."
+    return register_mixture('R513a', {'R1234yf': 0.56, 'R134a': 0.44})
 
 def R515b():
-    "Create and return the R515b mixture to be used into PropsSI."
-    R515b = 'R1234ze(E)[0.911]&R227ea[0.089]'
-    CAS_R1234zeE = CP.get_fluid_param_string('R1234ze(E)','CAS')
-    CAS_R227ea = CP.get_fluid_param_string('R227ea','CAS')
-    try:
-        CP.apply_simple_mixing_rule(CAS_R1234zeE, CAS_R227ea, 'linear')
-    except Exception as e:
-        print(R515b, 'already added to library\n\t', e)
-    return R515b
+    "Register (once per process) and return the R515b mixture to be used into PropsSI."
+    return register_mixture('R515b', {'R1234ze(E)': 0.911, 'R227ea': 0.089})
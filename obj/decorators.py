@@ -1,17 +1,170 @@
-from time import time
+from time import perf_counter
+from functools import wraps
+from collections import OrderedDict
+from copy import deepcopy
+from math import frexp
+import threading
+import pickle
+import os
 
 def timing(func, inputs=False):
+    "Printout of the execution time of each call (the function is called once, see instrumentation for the aggregated timers)."
+    @wraps(func)
     def func_decorated(*args, **kwargs):
-        t0 = time()
-        func(*args, **kwargs)
-        t1 = time()
+        t0 = perf_counter()
+        res = func(*args, **kwargs)
+        t1 = perf_counter()
         print(f"{func.__name__} - {t1-t0:.3f} s")
         if inputs:
             print(f"args: {args}")
             print(f"kwargs: {kwargs}")
-        return func(*args, **kwargs)
+        return res
     return func_decorated
 
+def _quantize(value, rtol:float):
+    """
+    Hashable cache key of a value, floats quantized to the relative tolerance (mantissa rounded to rtol).
+    Dicts (sorted by key), lists, tuples and numpy arrays are converted recursively.
+    Scalars are tagged with their type: True and 1, or 1 and "1", are different keys.
+    """
+    if value is None:
+        return value
+    if isinstance(value, bool):
+        return ('b', value)
+    if isinstance(value, int):
+        return ('i', value)
+    if isinstance(value, (str, bytes)):
+        return ('s' if isinstance(value, str) else 'y', value)
+    if isinstance(value, float) or (hasattr(value, 'dtype') and getattr(value, 'ndim', None) == 0):
+        value = float(value)
+        if value != value or value in (float('inf'), float('-inf')):
+            return repr(value)
+        m, e = frexp(value)
+        return ('f', round(m / rtol), e)
+    if isinstance(value, dict):
+        return ('d',) + tuple(sorted(((_quantize(k, rtol), _quantize(v, rtol)) for k, v in value.items()), key=repr))
+    if isinstance(value, (list, tuple)):
+        return ('l',) + tuple(_quantize(v, rtol) for v in value)
+    if hasattr(value, 'tolist'):
+        return ('a',) + (_quantize(value.tolist(), rtol),)
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+def _store_key(key) -> str:
+    "Disk store key (repr of the quantized key), TypeError for the objects whose repr is their identity."
+    key = repr(key)
+    if ' at 0x' in key:
+        raise TypeError(f"Arguments not supported by the disk store, their repr depends on the object identity: {key}")
+    return key
+
+class _MemoStore:
+    def __init__(self, filepath:str):
+        "sqlite disk store of the memoized values, shared by the processes (one connection for each process)."
+        self.filepath = filepath
+        self._pid = None
+        self._conn = None
+
+    def _connect(self):
+        if self._pid != os.getpid():
+            import sqlite3
+            self._conn = sqlite3.connect(self.filepath, timeout=60, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS memo (func TEXT, key TEXT, value BLOB, PRIMARY KEY (func, key))")
+            self._conn.commit()
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, func:str, key:str):
+        "Stored value, KeyError if not available."
+        row = self._connect().execute("SELECT value FROM memo WHERE func=? AND key=?", (func, key)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(row[0])
+
+    def set(self, func:str, key:str, value):
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO memo VALUES (?, ?, ?)", (func, key, pickle.dumps(value)))
+        conn.commit()
+
+    def clear(self, func:str):
+        conn = self._connect()
+        conn.execute("DELETE FROM memo WHERE func=?", (func,))
+        conn.commit()
+
+def memoize(rtol:float=1e-9, maxsize:int=1024, store:str=None, copy:bool=True):
+    """
+    Memoization of pure but expensive functions (e.g. models solved by nc_function_args/nc_function_dict).
+    The cache key is built from all the arguments, floats (also inside dicts, lists and arrays) quantized to
+    the relative tolerance: nearly identical inputs share the same result.
+    - rtol: float, default=1e-9, relative tolerance of the float arguments
+    - maxsize: int, default=1024, in-memory entries (least recently used evicted first), unbounded if None
+    - store: str, default=None, sqlite file path of the disk store, reused by later runs and parallel workers
+             (the key is the repr of the arguments: TypeError for objects whose repr is their identity, e.g. "<... at 0x...>")
+    - copy: bool, default=True, deep copy of the cached outputs returned (mutable outputs, e.g. dicts, are safe)
+    The decorated function has:
+    - cache_info(): dict, 'hits', 'misses', 'store_hits', 'size', 'maxsize'
+    - cache_clear(store=False): clear the in-memory cache (and the stored values of the function)
+    Usage: @memoize() or @memoize(rtol=1e-6, store="memo.sqlite") (also @memoize, without parentheses)
+    NOTE: values close to a quantization step boundary can fall into different keys (cache miss only).
+    """
+    def decorator(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        cache = OrderedDict()
+        stats = {'hits': 0, 'misses': 0, 'store_hits': 0}
+        disk = _MemoStore(store) if store is not None else None
+        lock = threading.Lock()
+        output = deepcopy if copy else (lambda v: v)
+
+        @wraps(func)
+        def func_memoized(*args, **kwargs):
+            key = (_quantize(args, rtol), _quantize(kwargs, rtol))
+            with lock:
+                if key in cache:
+                    cache.move_to_end(key)
+                    stats['hits'] += 1
+                    return output(cache[key])
+            if disk is not None:
+                store_key = _store_key(key)
+                try:
+                    value = disk.get(name, store_key)
+                    hit = 'store_hits'
+                except KeyError:
+                    value = func(*args, **kwargs)
+                    hit = 'misses'
+                    disk.set(name, store_key, value)
+            else:
+                value = func(*args, **kwargs)
+                hit = 'misses'
+            with lock:
+                stats[hit] += 1
+                cache[key] = output(value)
+                if maxsize is not None and len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return value
+
+        def cache_info() -> dict:
+            with lock:
+                return {**stats, 'size': len(cache), 'maxsize': maxsize}
+
+        def cache_clear(store:bool=False):
+            with lock:
+                cache.clear()
+                stats.update({'hits': 0, 'misses': 0, 'store_hits': 0})
+            if store and disk is not None:
+                disk.clear(name)
+
+        func_memoized.cache_info = cache_info
+        func_memoized.cache_clear = cache_clear
+        return func_memoized
+    if callable(rtol):
+        func, rtol = rtol, 1e-9
+        return decorator(func)
+    return decorator
+
 if __name__== "__main__":
     def fib(n):
         if n <= 2: return 1
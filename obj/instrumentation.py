@@ -0,0 +1,161 @@
+from time import perf_counter_ns
+from functools import wraps
+import inspect
+import os
+
+"""
+Registry of named timers, aggregated at low overhead (perf_counter_ns, one call of the timed function).
+Instrumentation disabled by default (the timed functions are called directly), enabled with enable() or the
+environment variable OBJ_TIMERS=1.
+The timers are local to each process (e.g. the workers of a sweep have their own registry).
+"""
+
+_ENABLED = os.environ.get("OBJ_TIMERS", "0") == "1"
+_TIMERS = {}
+SAMPLES = 1024 # durations kept for the percentiles of each timer
+
+class Timer:
+    __slots__ = ('name', 'count', 'total', 'min', 'max', '_samples', '_i')
+
+    def __init__(self, name:str):
+        """
+        Aggregated durations of a named timer [ns].
+        - name: str, timer name
+        The p95 is computed over the last SAMPLES durations (ring buffer).
+        """
+        self.name = name
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self._samples = []
+        self._i = 0
+
+    def add(self, ns:int):
+        "Add a duration [ns]."
+        self.count += 1
+        self.total += ns
+        if self.min is None or ns < self.min: self.min = ns
+        if self.max is None or ns > self.max: self.max = ns
+        if len(self._samples) < SAMPLES:
+            self._samples.append(ns)
+        else:
+            self._samples[self._i] = ns
+            self._i = (self._i + 1) % SAMPLES
+
+    def stats(self) -> dict:
+        """
+        Return
+        - stats: dict, 'count', 'total' [s], 'mean', 'min', 'max', 'p95' [ms]
+        """
+        if self.count == 0:
+            return {'count': 0, 'total': 0., 'mean': None, 'min': None, 'max': None, 'p95': None}
+        samples = sorted(self._samples)
+        p95 = samples[min(int(0.95 * len(samples)), len(samples) - 1)]
+        return {'count': self.count, 'total': self.total * 1e-9, 'mean': self.total / self.count * 1e-6,
+                'min': self.min * 1e-6, 'max': self.max * 1e-6, 'p95': p95 * 1e-6}
+
+def enable():
+    "Enable the instrumentation."
+    global _ENABLED
+    _ENABLED = True
+
+def disable():
+    "Disable the instrumentation: the timed functions are called directly, nothing is recorded."
+    global _ENABLED
+    _ENABLED = False
+
+def is_enabled() -> bool:
+    return _ENABLED
+
+def get_timer(name:str) -> Timer:
+    "Timer of the registry, created at the first call."
+    t = _TIMERS.get(name)
+    if t is None:
+        t = _TIMERS[name] = Timer(name)
+    return t
+
+def reset(name:str=None):
+    """
+    Clear the durations of the timers (the timers stay in the registry, bound to the timed functions).
+    - name: str, default=None, timer to be cleared, all the timers if None
+    """
+    for t in _TIMERS.values() if name is None else [_TIMERS[name]] if name in _TIMERS else []:
+        t.__init__(t.name)
+
+def timer_stats() -> dict:
+    "Statistics of all the timers, {name: stats} (see Timer.stats)."
+    return {name: t.stats() for name, t in _TIMERS.items()}
+
+def timed(name=None):
+    """
+    Decorator, the duration of each call is added to the named timer (the function is called once).
+    Coroutine functions are timed until the coroutine returns.
+    - name: str, default=None, timer name, module.function name if None
+    Usage: @timed() or @timed("name") (also @timed, without parentheses)
+    """
+    def decorator(func):
+        key = name if isinstance(name, str) else f"{func.__module__}.{func.__qualname__}"
+        t = get_timer(key)
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def func_timed(*args, **kwargs):
+                if not _ENABLED:
+                    return await func(*args, **kwargs)
+                t0 = perf_counter_ns()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    t.add(perf_counter_ns() - t0)
+        else:
+            @wraps(func)
+            def func_timed(*args, **kwargs):
+                if not _ENABLED:
+                    return func(*args, **kwargs)
+                t0 = perf_counter_ns()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    t.add(perf_counter_ns() - t0)
+        return func_timed
+    if callable(name):
+        return decorator(name)
+    return decorator
+
+class timer:
+    __slots__ = ('_timer', '_t0')
+
+    def __init__(self, name:str):
+        """
+        Context manager, the duration of the block is added to the named timer.
+        - name: str, timer name
+        Usage: with timer("name"): ...
+        """
+        self._timer = get_timer(name)
+        self._t0 = None
+
+    def __enter__(self):
+        self._t0 = perf_counter_ns() if _ENABLED else None
+        return self
+
+    def __exit__(self, *exc):
+        if self._t0 is not None:
+            self._timer.add(perf_counter_ns() - self._t0)
+        return False
+
+def report(settings:dict=None, sort:str="total"):
+    """
+    Report of the timers through table_printout, one record for each timer called at least once.
+    - settings: dict, default=None, TablePrintout settings (e.g. "printout", "export", "markdown")
+    - sort: str, default="total", sorting key (descending), "total", "count", "mean", "max", "p95" or "name"
+    Return
+    - table: TablePrintout, .table is the report formatted as string
+    """
+    from obj.table_printout import TablePrintout
+    stats = {name: s for name, s in timer_stats().items() if s['count'] > 0}
+    names = sorted(stats, key=lambda n: n if sort == "name" else -(stats[n][sort] or 0))
+    fmt = lambda v, f: "-" if v is None else f"{v:{f}}"
+    headers = ["timer", "count", "total [s]", "mean [ms]", "min [ms]", "max [ms]", "p95 [ms]"]
+    records = [[n, stats[n]['count'], fmt(stats[n]['total'], '.4f')] +
+               [fmt(stats[n][k], '.4f') for k in ['mean', 'min', 'max', 'p95']] for n in names]
+    return TablePrintout(headers, records, {} if settings is None else settings)
@@ -1,50 +1,79 @@
-def nc_function_args(settings, function, *args):
+from obj.utils import LazyModule
+from obj.instrumentation import timed
+from math import copysign
+from copy import deepcopy
+from time import perf_counter
+import inspect
+import traceback
+import warnings
+import os
+
+"loaded at the first use: numpy (traces, batch solver, brent), the process pool (sweep) and asyncio (async solvers)"
+np = LazyModule('numpy')
+concurrent_futures = LazyModule('concurrent.futures')
+asyncio = LazyModule('asyncio')
+
+NC_METHODS = ['step', 'secant', 'illinois', 'brent', 'newton']
+
+
+def _clip(x, x_min, x_max):
+    "x limits"
+    if x_min is not None and x < x_min: x = x_min
+    if x_max is not None and x > x_max: x = x_max
+    return x
+
+def _debug_trace(iteration, x, y, err, delta):
+    "trace callback of the DEBUG printouts"
+    print(f"{iteration} err: {abs(err):.4f} - x = {x:.4f} - y = {y:.4f} - y_t = {y - err:.4f}")
+
+def _get_trace(settings):
+    "trace callback from settings: 'trace' if given, the DEBUG printout if enabled, otherwise None"
+    trace = settings.get('trace')
+    if trace is None and settings.get('DEBUG', False):
+        trace = _debug_trace
+    return trace
+
+def _solution(x, y, count, conv, trend=None, delta=None):
+    return {'x': x, 'y': y, 'count': count, 'conv': conv, 'trend': trend, 'delta': delta}
+
+def _best(x0, y0, x1, y1, y_t):
+    "the point with the smallest error, used as starting point of the fallback"
+    if abs(y0 - y_t) < abs(y1 - y_t):
+        return x0, y0
+    return x1, y1
+
+def _secant_trend(x0, y0, x1, y1):
+    if x0 == x1 or y0 == y1:
+        return None
+    return (y1 - y0) * (x1 - x0) > 0
+
+def _nc_step(settings, count=0):
     """
-    Convergence method applied to function with arguments:
-    - settings:
-        - 'tol': float, tolerance value to assess the convergence
-        - 'delta': float, initial value for independent variable variation
-        - 'delta_scaler': float, scaler value that divides the delta
-        - 'x_0': float, initial value of independent variable
-        - 'x_min': float, [opt.] minimum allowed value for independent variable
-        - 'x_max': float, [opt.] maximum allowed value for independent variable
-        - 'y_t': float, output variable target
-        - 'trend': bool, default=None, function trend, monotonic increasing (True) or decreasing (False).
-                    If None, the trend is assessed automatically.
-        - 'count_max': int, maximum number of iterations
-        - 'DEBUG': bool, enables debugging printouts
-        - 'printout': print final result
-    - function: function on which the convergence value must be reached. The function can
-            be implemented on a single input or multiple ones. In case of multiple variables
-            are needed by the function (i.e. len(args)>0) only the first one is varied to reach the convergence:
-        - f(x) = y : single variable function
-        - f(x1, x2, x3, ...) = y : multiple variables function
-    - args: additional function inputs, they are not varied inside the convergence. 
-            Not needed for single variable functions.
+    Step method: x is varied by fixed delta steps, the delta is divided by
+    delta_scaler at each inversion of the direction.
+    - settings: dict, see nc_function_args
+    - count: int, default=0, evaluations already spent by a previous method (fallback)
+    Return
+    - sol: dict, solution ('x', 'y', 'count', 'conv', 'trend', 'delta')
     """
     tol = settings.get('tol')
     delta = settings.get('delta')
     delta_scaler = settings.get('delta_scaler', 2)
-    x = settings.get('x_0') # independent variable initialization
     x_min = settings.get('x_min')
     x_max = settings.get('x_max')
     y_t = settings.get('y_t')
-    trend = settings.get('trend', None) 
+    trend = settings.get('trend', None)
     count_max = settings.get('count_max')
     DEBUG = settings.get('DEBUG', False)
-    printout = settings.get('printout', False)
+    trace = _get_trace(settings)
 
-    def function_wrapper(function, x, args):
-        if len(args) > 0:
-            y = function(x, *args)
-        else:
-            y = function(x)
-        return y
+    x = settings.get('x_0') # independent variable initialization
+    y = yield ('f', x)
+    count += 1
 
     if trend is None:
         "assess the trend of the function"
-        y = function_wrapper(function, x, args)
-        y_up = function_wrapper(function, x + delta, args)
+        y_up = yield ('f', x + delta)
         if y < y_up:
             "Monotonic Increasing with x"
             trend = True
@@ -58,18 +87,10 @@ def nc_function_args(settings, function, *args):
     "initialization"
     inc = 1
     conv = False
-    count = 1
-
-    # if len(args) > 0:
-    #     y = function(x, *args)
-    # else:
-    #     y = function(x)
 
-    y = function_wrapper(function, x, args)
-    
     while True:
-        if DEBUG:
-            print(f"{count} err: {abs(y - y_t):.4f} - x = {x:.4f} - y = {y:.4f} - y_t = {y_t:.4f}")
+        if trace is not None:
+            trace(count, x, y, y - y_t, delta)
         if abs(y - y_t) <= tol:
             conv = True
             break
@@ -99,34 +120,598 @@ def nc_function_args(settings, function, *args):
                     inc = 1
                     delta /= delta_scaler
                 x += delta
-        
-        "x limits"
-        if x_min:
-            if x < x_min: x = x_min
-        if x_max:
-            if x > x_max: x = x_max
-
-        # if len(args) > 0:
-        #     y = function(x, *args)
-        # else:
-        #     y = function(x)
-        
-        y = function_wrapper(function, x, args)
+
+        x = _clip(x, x_min, x_max)
+        y = yield ('f', x)
 
         if count_max:
             if count >= count_max:
                 if DEBUG:
                     print("Iteration count limit reached. Exit the loop.")
                 break
-        
-    if printout:
-        if conv:
-            print(f"Convergence reached!\n\tIterations: {count} - Error: {abs(y - y_t):.4f}\nx = {x:.4f} - y = {y:.4f} - y_t = {y_t:.4f}")
+    return _solution(x, y, count, conv, trend, delta)
+
+def _nc_secant(settings):
+    """
+    Secant method: the first two points are x_0 and x_0 + delta.
+    Return
+    - sol: dict, solution ('x', 'y', 'count', 'conv', 'trend', 'delta')
+    """
+    tol = settings.get('tol')
+    delta = settings.get('delta')
+    x_min = settings.get('x_min')
+    x_max = settings.get('x_max')
+    y_t = settings.get('y_t')
+    count_max = settings.get('count_max')
+    trace = _get_trace(settings)
+
+    x0 = _clip(settings.get('x_0'), x_min, x_max)
+    y0 = yield ('f', x0)
+    count = 1
+    if abs(y0 - y_t) <= tol:
+        return _solution(x0, y0, count, True, settings.get('trend'), delta)
+    x1 = _clip(x0 + delta, x_min, x_max)
+    y1 = yield ('f', x1)
+    count += 1
+    x_best, y_best = _best(x0, y0, x1, y1, y_t)
+    diverging = 0
+    while True:
+        if trace is not None:
+            trace(count, x1, y1, y1 - y_t, x1 - x0)
+        if abs(y1 - y_t) <= tol:
+            return _solution(x1, y1, count, True, _secant_trend(x0, y0, x1, y1), abs(x1 - x0))
+        if count_max and count >= count_max:
+            break
+        if y1 == y0:
+            "flat secant, the next point cannot be computed"
+            break
+        x2 = _clip(x1 - (y1 - y_t) * (x1 - x0) / (y1 - y0), x_min, x_max)
+        if x2 == x1:
+            "stuck on the x limits"
+            break
+        x0, y0 = x1, y1
+        x1 = x2
+        y1 = yield ('f', x1)
+        count += 1
+        if abs(y1 - y_t) < abs(y_best - y_t):
+            x_best, y_best = x1, y1
+            diverging = 0
         else:
-            print(f"Convergence not reached!\n\tIterations: {count} - Error: {abs(y - y_t):.4f}\nx = {x:.4f} - y = {y:.4f} - y_t = {y_t:.4f}")
-    return x, y
+            diverging += 1
+            if diverging >= 3:
+                "the error did not improve for three iterations"
+                break
+    return _solution(x_best, y_best, count, False, _secant_trend(x0, y0, x1, y1), abs(x1 - x0))
 
+def _nc_newton(settings):
+    """
+    Newton method, the derivative of the function is required.
+    Return
+    - sol: dict, solution ('x', 'y', 'count', 'conv', 'trend', 'delta')
+    """
+    if settings.get('derivative') is None:
+        raise ValueError("The 'newton' method requires the 'derivative' function in the settings")
+    tol = settings.get('tol')
+    x_min = settings.get('x_min')
+    x_max = settings.get('x_max')
+    y_t = settings.get('y_t')
+    count_max = settings.get('count_max')
+    trace = _get_trace(settings)
 
+    x = _clip(settings.get('x_0'), x_min, x_max)
+    y = yield ('f', x)
+    count = 1
+    trend = settings.get('trend')
+    step = settings.get('delta')
+    while True:
+        if trace is not None:
+            trace(count, x, y, y - y_t, step)
+        if abs(y - y_t) <= tol:
+            return _solution(x, y, count, True, trend, step)
+        if count_max and count >= count_max:
+            break
+        dy = yield ('df', x)
+        if dy == 0:
+            "flat tangent, the next point cannot be computed"
+            break
+        trend = dy > 0
+        x_new = _clip(x - (y - y_t) / dy, x_min, x_max)
+        if x_new == x:
+            "stuck on the x limits"
+            break
+        step = abs(x_new - x)
+        x = x_new
+        y = yield ('f', x)
+        count += 1
+    return _solution(x, y, count, False, trend, step)
+
+def _nc_bracket(settings):
+    """
+    Search of an interval [a, b] where the error y - y_t changes its sign.
+    Starting from x_0, x is moved in the direction that reduces the error: while the
+    error decreases the step is extended up to twice the secant prediction (max doubling),
+    when the error increases the step is halved.
+    Return
+    - a, e_a, b, e_b: float, interval bounds and errors, e_a * e_b > 0 if the interval is not found
+    - count: int, number of function evaluations
+    """
+    tol = settings.get('tol')
+    delta = settings.get('delta')
+    x_min = settings.get('x_min')
+    x_max = settings.get('x_max')
+    y_t = settings.get('y_t')
+    trend = settings.get('trend', None)
+    count_max = settings.get('count_max')
+
+    def next_step(a, e_a, b, e_b):
+        s = abs(e_b * (b - a) / (e_b - e_a))
+        return min(2 * abs(b - a), 2 * s)
+
+    a = _clip(settings.get('x_0'), x_min, x_max)
+    e_a = (yield ('f', a)) - y_t
+    count = 1
+    if abs(e_a) <= tol:
+        return a, e_a, a, e_a, count
+    step = delta
+    if trend is None:
+        "probe to assess the direction"
+        b = _clip(a + delta, x_min, x_max)
+        e_b = (yield ('f', b)) - y_t
+        count += 1
+        if e_a * e_b <= 0 or abs(e_b) <= tol:
+            return a, e_a, b, e_b, count
+        if abs(e_b) < abs(e_a):
+            direction = 1
+            step = next_step(a, e_a, b, e_b)
+            a, e_a = b, e_b
+        else:
+            direction = -1
+            step = next_step(b, e_b, a, e_a) if e_b != e_a else delta
+    else:
+        direction = 1 if (e_a < 0) == trend else -1
+    while not (count_max and count >= count_max):
+        b = _clip(a + direction * step, x_min, x_max)
+        if b == a:
+            "x limit reached or step vanished"
+            break
+        e_b = (yield ('f', b)) - y_t
+        count += 1
+        if e_a * e_b <= 0 or abs(e_b) <= tol:
+            return a, e_a, b, e_b, count
+        if abs(e_b) < abs(e_a):
+            step = next_step(a, e_a, b, e_b)
+            a, e_a = b, e_b
+        else:
+            step /= 2
+    return a, e_a, a, e_a, count
+
+def _nc_illinois(settings):
+    """
+    Regula falsi method with the Illinois modification, applied once the root is bracketed.
+    Return
+    - sol: dict, solution ('x', 'y', 'count', 'conv', 'trend', 'delta')
+    """
+    tol = settings.get('tol')
+    y_t = settings.get('y_t')
+    count_max = settings.get('count_max')
+    trace = _get_trace(settings)
+
+    a, e_a, b, e_b, count = yield from _nc_bracket(settings)
+    for x, e in [(b, e_b), (a, e_a)]:
+        if abs(e) <= tol:
+            return _solution(x, e + y_t, count, True, _secant_trend(a, e_a, b, e_b), abs(b - a))
+    if e_a * e_b > 0:
+        return _solution(a, e_a + y_t, count, False, settings.get('trend'), settings.get('delta'))
+    trend = _secant_trend(a, e_a, b, e_b)
+    while not (count_max and count >= count_max):
+        c = b - e_b * (b - a) / (e_b - e_a)
+        if c == a or c == b:
+            "the interval cannot be reduced anymore"
+            break
+        e_c = (yield ('f', c)) - y_t
+        count += 1
+        if trace is not None:
+            trace(count, c, e_c + y_t, e_c, c - b)
+        if abs(e_c) <= tol:
+            return _solution(c, e_c + y_t, count, True, trend, abs(c - b))
+        if e_c * e_b < 0:
+            a, e_a = b, e_b
+        else:
+            "Illinois modification: halving of the retained end error"
+            e_a /= 2
+        b, e_b = c, e_c
+    x, y = _best(a, e_a + y_t, b, e_b + y_t, y_t)
+    return _solution(x, y, count, False, trend, abs(b - a))
+
+def _nc_brent(settings):
+    """
+    Brent method (bisection, secant and inverse quadratic interpolation), applied once the root is bracketed.
+    The optional setting 'xtol' stops the iterations when the interval is smaller than it.
+    Return
+    - sol: dict, solution ('x', 'y', 'count', 'conv', 'trend', 'delta')
+    """
+    tol = settings.get('tol')
+    xtol = settings.get('xtol', 0)
+    y_t = settings.get('y_t')
+    count_max = settings.get('count_max')
+    trace = _get_trace(settings)
+    eps = np.finfo(float).eps
+
+    a, e_a, b, e_b, count = yield from _nc_bracket(settings)
+    for x, e in [(b, e_b), (a, e_a)]:
+        if abs(e) <= tol:
+            return _solution(x, e + y_t, count, True, _secant_trend(a, e_a, b, e_b), abs(b - a))
+    if e_a * e_b > 0:
+        return _solution(a, e_a + y_t, count, False, settings.get('trend'), settings.get('delta'))
+    trend = _secant_trend(a, e_a, b, e_b)
+    c, e_c = b, e_b
+    d = e = b - a
+    while True:
+        if e_b * e_c > 0:
+            "c is moved to keep the root between b and c"
+            c, e_c = a, e_a
+            d = e = b - a
+        if abs(e_c) < abs(e_b):
+            a, b, c = b, c, b
+            e_a, e_b, e_c = e_b, e_c, e_b
+        if trace is not None:
+            trace(count, b, e_b + y_t, e_b, d)
+        if abs(e_b) <= tol:
+            return _solution(b, e_b + y_t, count, True, trend, abs(c - b))
+        tol_1 = 2 * eps * abs(b) + 0.5 * xtol
+        x_m = 0.5 * (c - b)
+        if abs(x_m) <= tol_1 or (count_max and count >= count_max):
+            break
+        if abs(e) >= tol_1 and abs(e_a) > abs(e_b):
+            s = e_b / e_a
+            if a == c:
+                "secant"
+                p = 2 * x_m * s
+                q = 1 - s
+            else:
+                "inverse quadratic interpolation"
+                q = e_a / e_c
+                r = e_b / e_c
+                p = s * (2 * x_m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * x_m * q - abs(tol_1 * q), abs(e * q)):
+                e = d
+                d = p / q
+            else:
+                "bisection"
+                d = e = x_m
+        else:
+            "bisection"
+            d = e = x_m
+        a, e_a = b, e_b
+        b += d if abs(d) > tol_1 else copysign(tol_1, x_m)
+        e_b = (yield ('f', b)) - y_t
+        count += 1
+    return _solution(b, e_b + y_t, count, False, trend, abs(c - b))
+
+_NC_METHODS = {'secant': _nc_secant,
+               'illinois': _nc_illinois,
+               'brent': _nc_brent,
+               'newton': _nc_newton}
+
+def _nc_solve_gen(settings):
+    """
+    Convergence core shared by nc_function_args and nc_function_dict.
+    The method defined by settings['method'] is applied, the step method is
+    used as fallback (restarting from x_0) when the other methods fail before converging.
+    The core (and all the methods) is a generator independent of how the function is evaluated:
+    it yields the evaluation requests ('f', x) or ('df', x) for the derivative, and receives
+    the evaluated values (see _nc_solve and _nc_solve_async).
+    - settings: dict, see nc_function_args
+    Return
+    - sol: dict, solution ('x', 'y', 'count', 'conv', 'trend', 'delta')
+    """
+    method = settings.get('method', 'step')
+    count_max = settings.get('count_max')
+    trace = settings.get('trace')
+    if isinstance(trace, ConvergenceTrace):
+        trace.new_solve()
+    if method not in NC_METHODS:
+        raise ValueError(f"Method '{method}' not available, allowed methods: {NC_METHODS}")
+    if method == 'step':
+        return (yield from _nc_step(settings))
+    sol = yield from _NC_METHODS[method](settings)
+    if sol['conv'] or (count_max and sol['count'] >= count_max):
+        return sol
+    if settings.get('DEBUG', False):
+        print(f"The {method} method did not converge, fallback to the step method.")
+    return (yield from _nc_step(settings, count=sol['count']))
+
+def _nc_solve(fun, settings, dfun=None):
+    """
+    Convergence core, synchronous evaluation of the function.
+    - fun: callable, f(x) = y
+    - settings: dict, see nc_function_args
+    - dfun: callable, default=None, derivative f'(x) used by the 'newton' method
+    Return
+    - sol: dict, solution ('x', 'y', 'count', 'conv', 'trend', 'delta')
+    """
+    solver = _nc_solve_gen(settings)
+    try:
+        kind, x = next(solver)
+        while True:
+            kind, x = solver.send(fun(x) if kind == 'f' else dfun(x))
+    except StopIteration as stop:
+        return stop.value
+
+async def _nc_solve_async(fun, settings, dfun=None):
+    """
+    Convergence core, asynchronous evaluation of the function.
+    - fun: coroutine function, await f(x) = y
+    - settings: dict, see nc_function_args
+    - dfun: coroutine function, default=None, derivative await f'(x) used by the 'newton' method
+    Return
+    - sol: dict, solution ('x', 'y', 'count', 'conv', 'trend', 'delta')
+    """
+    solver = _nc_solve_gen(settings)
+    try:
+        kind, x = next(solver)
+        while True:
+            kind, x = solver.send(await (fun(x) if kind == 'f' else dfun(x)))
+    except StopIteration as stop:
+        return stop.value
+
+class ConvergenceResult:
+    def __init__(self, x, y, conv, count, evaluations=0, cache_hits=0, time=0., trend=None, delta=None, inp_dict=None, res=None):
+        """
+        Structured result of a convergence solve.
+        - x: float, independent variable at convergence
+        - y: float, output variable at convergence
+        - conv: bool, True if the convergence is reached
+        - count: int, number of iterations
+        - evaluations: int, number of function evaluations actually performed
+        - cache_hits: int, number of function evaluations avoided by the evaluation cache
+        - time: float, wall time of the solve [s]
+        - trend: bool, function trend (detected or given)
+        - delta: float, last variation of the independent variable
+        - inp_dict: dict, [nc_function_dict only] input dictionary at convergence
+        - res: dict, [nc_function_dict only] function output at convergence
+        """
+        self.x = x
+        self.y = y
+        self.conv = conv
+        self.count = count
+        self.evaluations = evaluations
+        self.cache_hits = cache_hits
+        self.time = time
+        self.trend = trend
+        self.delta = delta
+        self.inp_dict = inp_dict
+        self.res = res
+
+    def __repr__(self):
+        return (f"ConvergenceResult(x={self.x}, y={self.y}, conv={self.conv}, count={self.count}, "
+                f"evaluations={self.evaluations}, cache_hits={self.cache_hits}, time={self.time:.6f})")
+
+    def to_dict(self) -> dict:
+        "Result as dictionary, e.g. to be collected in a table of operating points."
+        return dict(vars(self))
+
+class ConvergenceTrace:
+    columns = ['solve', 'iteration', 'x', 'y', 'error', 'delta']
+
+    def __init__(self, size:int=100000):
+        """
+        Structured convergence trace: each iteration (solve, iteration, x, y, error, delta) is recorded
+        into a preallocated ring buffer, the oldest records are overwritten when the buffer is full.
+        To be provided as settings['trace'], the same trace can be shared by all the solves of a sweep.
+        - size: int, default=100000, number of records kept
+        """
+        self.size = size
+        self.data = np.empty((size, len(self.columns)))
+        self.n = 0 # total number of records
+        self.solve = -1 # index of the current solve
+
+    def new_solve(self):
+        "A new solve is started, called by the convergence functions."
+        self.solve += 1
+
+    def __call__(self, iteration, x, y, err, delta):
+        self.data[self.n % self.size] = (self.solve, iteration, x, y, err, delta)
+        self.n += 1
+
+    def extend(self, records):
+        """
+        Records appended to the trace, e.g. the traces of the workers of a sweep (see nc_function_dict_sweep).
+        - records: 2D array, records with the trace columns
+        """
+        self.n += max(len(records) - self.size, 0) # records overwritten in the same call
+        records = records[-self.size:]
+        self.data[(self.n + np.arange(len(records))) % self.size] = records
+        self.n += len(records)
+
+    def clear(self):
+        self.n = 0
+        self.solve = -1
+
+    def to_array(self) -> 'np.ndarray':
+        "Records in chronological order, 2D array with the trace columns."
+        if self.n <= self.size:
+            return self.data[:self.n].copy()
+        i = self.n % self.size
+        return np.concatenate([self.data[i:], self.data[:i]])
+
+    def to_arrays(self) -> dict:
+        "Records in chronological order, dict of 1D arrays with the trace columns as keys."
+        data = self.to_array()
+        return {c: data[:, i] for i, c in enumerate(self.columns)}
+
+    def to_csv(self, filepath:str):
+        "Export of the records in chronological order to csv file."
+        np.savetxt(filepath, self.to_array(), fmt='%.10g', delimiter=',', header=','.join(self.columns), comments='')
+
+class _EvalCache:
+    def __init__(self, function, y_name=None, inp_dict=None):
+        """
+        Per-solve memo of the function evaluations (x -> value): no x is evaluated twice.
+        A snapshot of the output is stored when the cache is filled: functions returning the same (mutated)
+        dictionary at each call (e.g. the updated input dictionary) get the values of the cached x.
+        - function: callable, f(x) = value
+        - y_name: str, default=None, key of the output variable when the value is a dictionary
+        - inp_dict: dict, default=None, input dictionary modified by the function, a snapshot is stored for each x
+                    (see restore)
+        """
+        self.function = function
+        self.y_name = y_name
+        self.inp_dict = inp_dict
+        self.values = {} # x -> output snapshot
+        self.ys = {} # x -> output variable
+        self.inputs = {} # x -> input dictionary snapshot
+        self.evaluations = 0
+        self.hits = 0
+
+    def _store(self, x, value):
+        if self.y_name is None:
+            self.values[x] = self.ys[x] = value
+        else:
+            self.ys[x] = float(value[self.y_name])
+            self.values[x] = deepcopy(value)
+        if self.inp_dict is not None:
+            self.inputs[x] = self.values[x] if value is self.inp_dict else deepcopy(self.inp_dict)
+        self.evaluations += 1
+        return self.ys[x]
+
+    def restore(self, x):
+        """
+        Input dictionary restored in place to its state after the evaluation of x (the fields written by the function
+        belong to x, not to the last x evaluated).
+        Return
+        - res: output of x, the input dictionary itself if the function returns it
+        """
+        self.inp_dict.clear()
+        self.inp_dict.update(deepcopy(self.inputs[x]))
+        return self.inp_dict if self.inputs[x] is self.values[x] else self.values[x]
+
+    def __call__(self, x):
+        if x in self.ys:
+            self.hits += 1
+            return self.ys[x]
+        return self._store(x, self.function(x))
+
+class _AsyncEvalCache(_EvalCache):
+    "Per-solve memo of the function evaluations, asynchronous function."
+    async def __call__(self, x):
+        if x in self.ys:
+            self.hits += 1
+            return self.ys[x]
+        value = self.function(x)
+        if inspect.isawaitable(value):
+            value = await value
+        return self._store(x, value)
+
+def _final_printout(result, y_t, x_name=None, y_t_name=None):
+    x, y, count = result.x, result.y, result.count
+    s = "Convergence reached!" if result.conv else "Convergence not reached!"
+    s += f"\n\tIterations: {count} - Error: {abs(y - y_t):.4f}\n"
+    if x_name is None:
+        s += f"x = {x:.4f} - y = {y:.4f} - y_t = {y_t:.4f}"
+    else:
+        s += f"x ({x_name}) = {x:.4f} - y ({y_t_name}) = {y:.4f} - y_t = {y_t:.4f}"
+    print(s)
+
+def _nc_args(settings, function, args):
+    """
+    Solution of nc_function_args.
+    Return
+    - result: ConvergenceResult
+    """
+    derivative = settings.get('derivative')
+    t0 = perf_counter()
+
+    def function_wrapper(function, x, args):
+        if len(args) > 0:
+            y = function(x, *args)
+        else:
+            y = function(x)
+        return y
+
+    fun = _EvalCache(lambda x: function_wrapper(function, x, args))
+    dfun = None if derivative is None else lambda x: function_wrapper(derivative, x, args)
+    sol = _nc_solve(fun, settings, dfun)
+    return ConvergenceResult(sol['x'], sol['y'], sol['conv'], sol['count'], fun.evaluations, fun.hits,
+                             perf_counter() - t0, sol['trend'], sol['delta'])
+
+def _nc_dict(settings, function, inp_dict):
+    """
+    Solution of nc_function_dict.
+    Return
+    - result: ConvergenceResult, including the input dictionary and the function output at convergence
+    """
+    x_name = settings.get('x_name')
+    y_t_name = settings.get('y_t_name')
+    derivative = settings.get('derivative')
+    t0 = perf_counter()
+
+    def function_wrapper(function, inp_dict, x, x_name):
+        inp_dict[x_name] = x
+        res = function(inp_dict)
+        return res
+
+    def derivative_wrapper(x):
+        inp_dict[x_name] = x
+        return derivative(inp_dict)
+
+    fun = _EvalCache(lambda x: function_wrapper(function, inp_dict, x, x_name), y_t_name, inp_dict)
+    dfun = None if derivative is None else derivative_wrapper
+    sol = _nc_solve(fun, settings, dfun)
+
+    res = fun.restore(sol['x'])
+    return ConvergenceResult(sol['x'], sol['y'], sol['conv'], sol['count'], fun.evaluations, fun.hits,
+                             perf_counter() - t0, sol['trend'], sol['delta'], inp_dict, res)
+
+@timed()
+def nc_function_args(settings, function, *args):
+    """
+    Convergence method applied to function with arguments:
+    - settings:
+        - 'tol': float, tolerance value to assess the convergence
+        - 'delta': float, initial value for independent variable variation
+        - 'delta_scaler': float, scaler value that divides the delta
+        - 'x_0': float, initial value of independent variable
+        - 'x_min': float, [opt.] minimum allowed value for independent variable (None: no limit, 0 is a limit)
+        - 'x_max': float, [opt.] maximum allowed value for independent variable (None: no limit, 0 is a limit)
+        - 'y_t': float, output variable target
+        - 'trend': bool, default=None, function trend, monotonic increasing (True) or decreasing (False).
+                    If None, the trend is assessed automatically.
+        - 'count_max': int, maximum number of iterations
+        - 'method': str, default='step', convergence method, the step method is the fallback of the others:
+            - 'step': x varied by delta steps, delta scaled at each inversion of the direction
+            - 'secant': secant method starting from x_0 and x_0 + delta
+            - 'illinois': regula falsi with Illinois modification, the root is bracketed starting from x_0
+            - 'brent': Brent method, the root is bracketed starting from x_0
+            - 'newton': Newton method, the 'derivative' is required
+        - 'derivative': function, [opt.] derivative of the function, same inputs of the function
+        - 'xtol': float, default=0, [opt.] minimum interval width for the 'brent' method
+        - 'trace': ConvergenceTrace or function, default=None, [opt.] called at each iteration
+                   as trace(iteration, x, y, error, delta)
+        - 'DEBUG': bool, enables debugging printouts
+        - 'printout': print final result
+        - 'result': bool, default=False, a ConvergenceResult is returned
+    - function: function on which the convergence value must be reached. The function can
+            be implemented on a single input or multiple ones. In case of multiple variables
+            are needed by the function (i.e. len(args)>0) only the first one is varied to reach the convergence:
+        - f(x) = y : single variable function
+        - f(x1, x2, x3, ...) = y : multiple variables function
+    - args: additional function inputs, they are not varied inside the convergence. 
+            Not needed for single variable functions.
+    The function is evaluated only once for each x (per-solve evaluation cache).
+    """
+    result = _nc_args(settings, function, args)
+    if settings.get('printout', False):
+        _final_printout(result, settings.get('y_t'))
+    if settings.get('result', False):
+        return result
+    return result.x, result.y
+
+@timed()
 def nc_function_dict(settings, function, inp_dict):
     """
     Convergence method applied to function dictionary (both input and output):
@@ -136,15 +721,22 @@ def nc_function_dict(settings, function, inp_dict):
         - 'delta_scaler': float, scaler value that divides the delta
         - 'x_name': str, independent variable name (i.e. dictionary key)
         - 'x_0': float, initial value of independent variable
-        - 'x_min': float, [opt.] minimum allowed value for independent variable
-        - 'x_max': float, [opt.] maximum allowed value for independent variable
+        - 'x_min': float, [opt.] minimum allowed value for independent variable (None: no limit, 0 is a limit)
+        - 'x_max': float, [opt.] maximum allowed value for independent variable (None: no limit, 0 is a limit)
         - 'y_t_name': str, output variable name (i.e. dictionary key)
         - 'y_t': float, output variable target
         - 'trend': bool, default=None, function trend, monotonic increasing (True) or decreasing (False).
                     If None, the trend is assessed automatically.
         - 'count_max': int, maximum number of iterations
+        - 'method': str, default='step', convergence method (see nc_function_args)
+        - 'derivative': function, [opt.] derivative of y_t_name with respect to x_name,
+                        it takes the input dictionary and returns a float
+        - 'xtol': float, default=0, [opt.] minimum interval width for the 'brent' method
+        - 'trace': ConvergenceTrace or function, default=None, [opt.] called at each iteration
+                   as trace(iteration, x, y, error, delta)
         - 'DEBUG': bool, enables debugging printouts
         - 'printout': print final result
+        - 'result': bool, default=False, a ConvergenceResult is returned
     - function: function on which the convergence value must be reached. The function can
             be implemented on a single input or multiple ones. In case of multiple variables
             are needed by the function (i.e. len(args)>0) only the first one is varied to reach the convergence:
@@ -152,106 +744,438 @@ def nc_function_dict(settings, function, inp_dict):
         - f(x1, x2, x3, ...) = y : multiple variables function
     - args: additional function inputs, they are not varied inside the convergence. 
             Not needed for single variable functions.
+    The function is evaluated only once for each x (per-solve evaluation cache).
+    """
+    result = _nc_dict(settings, function, inp_dict)
+    if settings.get('printout', False):
+        _final_printout(result, settings.get('y_t'), settings.get('x_name'), settings.get('y_t_name'))
+    if settings.get('result', False):
+        return result
+    return result.inp_dict, result.res
+
+def _nc_sweep_chunk(settings, function, chunk, trace=None):
+    """
+    Worker of nc_function_dict_sweep: the input dictionaries of the chunk are solved
+    one after the other, the errors are captured for each task.
+    - chunk: list[tuple[int, dict]], index and input dictionary of each task
+    - trace: tuple, default=None, (size, base) of a worker ConvergenceTrace, the solve column is base + index
+    Return
+    - results: list[dict], see nc_function_dict_sweep
+    - records: 2D array, records of the worker trace (None without trace)
+    """
+    if trace is not None:
+        size, base = trace
+        trace = ConvergenceTrace(size)
+        settings = {**settings, 'trace': trace}
+    results = []
+    for i, inp_dict in chunk:
+        inp_dict = deepcopy(inp_dict) # nc_function_dict mutates the input dictionary
+        if trace is not None:
+            trace.solve = base + i - 1 # incremented by the solve
+        try:
+            inp_dict, res = nc_function_dict(settings, function, inp_dict)
+            results.append({'index': i, 'inp_dict': inp_dict, 'res': res, 'error': None})
+        except Exception as e:
+            results.append({'index': i, 'inp_dict': inp_dict, 'res': None,
+                            'error': f"{type(e).__name__}: {e}\n{traceback.format_exc()}"})
+    return results, None if trace is None else trace.to_array()
+
+def _nc_sweep_chunks(inp_dicts, chunksize):
+    chunk = []
+    for i, inp_dict in enumerate(inp_dicts):
+        chunk.append((i, inp_dict))
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _nc_sweep_stream(settings, function, inp_dicts, max_workers, chunksize):
+    if max_workers == 1:
+        for chunk in _nc_sweep_chunks(inp_dicts, chunksize):
+            yield from _nc_sweep_chunk(settings, function, chunk)[0]
+        return
+    trace = settings.get('trace')
+    worker_trace = None
+    if isinstance(trace, ConvergenceTrace):
+        "each worker records into its own trace, the records are merged into the parent trace"
+        worker_trace = (trace.size, trace.solve + 1)
+        settings = {k: v for k, v in settings.items() if k != 'trace'}
+    elif trace is not None:
+        warnings.warn("nc_function_dict_sweep: the trace callback is called in the worker processes, "
+                      "only a ConvergenceTrace is merged back (use max_workers=1 for other callbacks)")
+    n_tasks = 0
+    with concurrent_futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        "bounded window of chunks in flight: the input dictionaries are read (and pickled) as the workers progress"
+        window = 2 * (max_workers or os.cpu_count() or 1)
+        chunks = _nc_sweep_chunks(inp_dicts, chunksize)
+        pending = set()
+        while True:
+            for chunk in chunks:
+                pending.add(executor.submit(_nc_sweep_chunk, settings, function, chunk, worker_trace))
+                n_tasks += len(chunk)
+                if len(pending) >= window:
+                    break
+            if not pending:
+                break
+            done, pending = concurrent_futures.wait(pending, return_when=concurrent_futures.FIRST_COMPLETED)
+            for future in done:
+                results, records = future.result()
+                if records is not None:
+                    trace.extend(records)
+                yield from results
+    if worker_trace is not None:
+        trace.solve = worker_trace[1] + n_tasks - 1
+
+def nc_function_dict_sweep(settings, function, inp_dicts, max_workers=None, chunksize=1, streaming=False):
+    """
+    Parallel sweep of nc_function_dict over multiple input dictionaries (e.g. grid of
+    ambient temperatures, loads, refrigerants). The solves are spread across a process pool.
+    - settings: dict, nc_function_dict settings, the same for all the input dictionaries
+    - function: function of nc_function_dict, it must be picklable (i.e. defined at module level)
+    - inp_dicts: iterable[dict], input dictionaries, each task works on its own copy
+    - max_workers: int, default=None, number of processes (None: number of CPUs, 1: serial run in this process)
+    - chunksize: int, default=1, number of input dictionaries sent to a worker at once
+    - streaming: bool, default=False, results yielded as they are completed (i.e. not in order), at most
+                 2*max_workers chunks are in flight: inp_dicts is consumed as the results are yielded
+    A ConvergenceTrace in settings['trace'] is filled with the records of the workers (solve column: position of the
+    input dictionary), other trace callbacks are called in the workers.
+    Return
+    - results: list[dict] in the order of inp_dicts, or generator of dict if streaming:
+        - 'index': int, position of the input dictionary in inp_dicts
+        - 'inp_dict': dict, input dictionary at convergence
+        - 'res': dict, function output at convergence, None if an error occurred
+        - 'error': str, None if no error occurred, otherwise the error description and traceback
+    """
+    stream = _nc_sweep_stream(settings, function, inp_dicts, max_workers, chunksize)
+    if streaming:
+        return stream
+    results = sorted(stream, key=lambda r: r['index'])
+    return results
+
+
+async def _nc_args_async(settings, function, args):
+    """
+    Solution of nc_function_args_async.
+    Return
+    - result: ConvergenceResult
+    """
+    derivative = settings.get('derivative')
+    t0 = perf_counter()
+
+    async def derivative_wrapper(x):
+        dy = derivative(x, *args)
+        return (await dy) if inspect.isawaitable(dy) else dy
+
+    fun = _AsyncEvalCache(lambda x: function(x, *args))
+    dfun = None if derivative is None else derivative_wrapper
+    sol = await _nc_solve_async(fun, settings, dfun)
+    return ConvergenceResult(sol['x'], sol['y'], sol['conv'], sol['count'], fun.evaluations, fun.hits,
+                             perf_counter() - t0, sol['trend'], sol['delta'])
+
+async def _nc_dict_async(settings, function, inp_dict):
+    """
+    Solution of nc_function_dict_async.
+    Return
+    - result: ConvergenceResult, including the input dictionary and the function output at convergence
+    """
+    x_name = settings.get('x_name')
+    y_t_name = settings.get('y_t_name')
+    derivative = settings.get('derivative')
+    t0 = perf_counter()
+
+    def function_wrapper(function, inp_dict, x, x_name):
+        inp_dict[x_name] = x
+        return function(inp_dict)
+
+    async def derivative_wrapper(x):
+        inp_dict[x_name] = x
+        dy = derivative(inp_dict)
+        return (await dy) if inspect.isawaitable(dy) else dy
+
+    fun = _AsyncEvalCache(lambda x: function_wrapper(function, inp_dict, x, x_name), y_t_name, inp_dict)
+    dfun = None if derivative is None else derivative_wrapper
+    sol = await _nc_solve_async(fun, settings, dfun)
+
+    res = fun.restore(sol['x'])
+    return ConvergenceResult(sol['x'], sol['y'], sol['conv'], sol['count'], fun.evaluations, fun.hits,
+                             perf_counter() - t0, sol['trend'], sol['delta'], inp_dict, res)
+
+@timed()
+async def nc_function_args_async(settings, function, *args):
+    """
+    Asynchronous version of nc_function_args, for I/O bound functions (e.g. remote evaluations).
+    - settings: dict, see nc_function_args
+    - function: coroutine function (plain functions are accepted too), await f(x, *args) = y
+    - args: additional function inputs, they are not varied inside the convergence.
+    Return
+    - x, y: float, or ConvergenceResult if settings['result'] is True
+    """
+    result = await _nc_args_async(settings, function, args)
+    if settings.get('printout', False):
+        _final_printout(result, settings.get('y_t'))
+    if settings.get('result', False):
+        return result
+    return result.x, result.y
+
+@timed()
+async def nc_function_dict_async(settings, function, inp_dict):
+    """
+    Asynchronous version of nc_function_dict, for I/O bound functions (e.g. remote evaluations).
+    - settings: dict, see nc_function_dict
+    - function: coroutine function (plain functions are accepted too), await f(inp_dict) = res
+    - inp_dict: dict, input dictionary
+    Return
+    - inp_dict, res: dict, or ConvergenceResult if settings['result'] is True
+    """
+    result = await _nc_dict_async(settings, function, inp_dict)
+    if settings.get('printout', False):
+        _final_printout(result, settings.get('y_t'), settings.get('x_name'), settings.get('y_t_name'))
+    if settings.get('result', False):
+        return result
+    return result.inp_dict, result.res
+
+def _limited(function, semaphore):
+    "function wrapper limiting the number of evaluations in flight"
+    async def function_limited(*args):
+        async with semaphore:
+            y = function(*args)
+            return (await y) if inspect.isawaitable(y) else y
+    return function_limited
+
+async def nc_gather_async(settings, function, inputs, kind='args', max_in_flight=16):
+    """
+    Many independent solves run concurrently: while an evaluation waits (I/O) the other solves go ahead.
+    - settings: dict or list[dict], settings shared by all the solves or one for each solve
+    - function: coroutine function of nc_function_args_async or nc_function_dict_async
+    - inputs: iterable, one item for each solve:
+        - kind='args': tuple, additional function inputs (args)
+        - kind='dict': dict, input dictionary, each solve needs its own dictionary
+    - kind: str, default='args', 'args' for nc_function_args_async, 'dict' for nc_function_dict_async
+    - max_in_flight: int, default=16, maximum number of evaluations in flight at the same time
+    Return
+    - results: list, results of each solve in the order of inputs (see nc_function_args_async and
+               nc_function_dict_async), errors are returned in place of the results
+    """
+    if kind not in ['args', 'dict']:
+        raise ValueError(f"kind '{kind}' not available, allowed kinds: ['args', 'dict']")
+    function = _limited(function, asyncio.Semaphore(max_in_flight))
+    inputs = list(inputs)
+    settings = settings if isinstance(settings, list) else [settings] * len(inputs)
+    if kind == 'args':
+        solves = [nc_function_args_async(s, function, *args) for s, args in zip(settings, inputs)]
+    else:
+        solves = [nc_function_dict_async(s, function, inp_dict) for s, inp_dict in zip(settings, inputs)]
+    return await asyncio.gather(*solves, return_exceptions=True)
+
+
+class NcContinuation:
+    def __init__(self, settings:dict):
+        """
+        Continuation (warm-start) solver for sequential sweeps of neighbouring operating points:
+        each solve starts from the previous solution, with the trend already known and a shrunk delta.
+        - settings: dict, nc_function_args / nc_function_dict settings used for the first point, additional keys:
+            - 'delta_shrink': float, default=4, the delta of the following points is the initial one divided by delta_shrink,
+                              limited to the last solution displacement (divided by delta_shrink when extrapolating)
+            - 'extrapolate': bool, default=False, the starting point is linearly extrapolated from the last two solutions
+        """
+        self.settings = dict(settings)
+        self.delta_shrink = self.settings.pop('delta_shrink', 4)
+        self.extrapolate = self.settings.pop('extrapolate', False)
+        self.reset()
+
+    def reset(self):
+        "The carried information is removed, the next solve starts from the user settings."
+        self.history = [] # list of (s, x) of the converged points
+        self.trend = self.settings.get('trend')
+        self.count = 0 # total number of function evaluations
+
+    def next_settings(self, y_t=None, s=None) -> dict:
+        """
+        Settings of the next solve.
+        - y_t: float, default=None, output variable target, settings value if None
+        - s: float, default=None, sweep parameter of the next point, used by the extrapolation
+             (uniform spacing assumed if None)
+        """
+        settings = dict(self.settings)
+        if y_t is not None:
+            settings['y_t'] = y_t
+        if len(self.history) == 0:
+            return settings
+        settings['trend'] = self.trend
+        delta = self.settings['delta'] / self.delta_shrink
+        s_last, x_last = self.history[-1]
+        x_0 = x_last
+        if len(self.history) > 1:
+            s_prev, x_prev = self.history[-2]
+            displacement = abs(x_last - x_prev) / (self.delta_shrink if self.extrapolate else 1)
+            if 0 < displacement < delta:
+                delta = displacement
+        settings['delta'] = delta
+        if self.extrapolate and len(self.history) > 1:
+            if s is None or s_last is None or s_prev is None:
+                x_0 = 2 * x_last - x_prev
+            elif s_last != s_prev:
+                x_0 = x_last + (x_last - x_prev) * (s - s_last) / (s_last - s_prev)
+        settings['x_0'] = _clip(x_0, settings.get('x_min'), settings.get('x_max'))
+        return settings
+
+    def _update(self, result, s):
+        self.count += result.evaluations
+        if result.trend is not None:
+            self.trend = result.trend
+        if result.conv:
+            self.history = self.history[-1:] + [(s, result.x)]
+
+    def solve_args(self, function, *args, y_t=None, s=None):
+        """
+        nc_function_args applied to the next point of the sweep.
+        - function, args: see nc_function_args
+        - y_t: float, default=None, output variable target, settings value if None
+        - s: float, default=None, sweep parameter of the point (for extrapolation)
+        Return
+        - x: float, independent variable at convergence
+        - y: float, output variable at convergence
+        """
+        settings = self.next_settings(y_t, s)
+        result = _nc_args(settings, function, args)
+        self._update(result, s)
+        if settings.get('printout', False):
+            _final_printout(result, settings.get('y_t'))
+        if settings.get('result', False):
+            return result
+        return result.x, result.y
+
+    def solve_dict(self, function, inp_dict, y_t=None, s=None):
+        """
+        nc_function_dict applied to the next point of the sweep.
+        - function, inp_dict: see nc_function_dict
+        - y_t: float, default=None, output variable target, settings value if None
+        - s: float, default=None, sweep parameter of the point (for extrapolation)
+        Return
+        - inp_dict: dict, input dictionary at convergence
+        - res: dict, function output at convergence
+        """
+        settings = self.next_settings(y_t, s)
+        result = _nc_dict(settings, function, inp_dict)
+        self._update(result, s)
+        if settings.get('printout', False):
+            _final_printout(result, settings.get('y_t'), settings.get('x_name'), settings.get('y_t_name'))
+        if settings.get('result', False):
+            return result
+        return result.inp_dict, result.res
+
+
+@timed()
+def nc_function_args_batch(settings, function, *args):
+    """
+    Vectorized convergence method applied to a batch of operating points: the same
+    step-and-halve logic of nc_function_args is run in lockstep for all the points.
+    - settings:
+        - 'tol': float, tolerance value to assess the convergence
+        - 'delta': float or array, initial value for independent variable variation
+        - 'delta_scaler': float, scaler value that divides the delta
+        - 'x_0': float or array, initial value of independent variable
+        - 'x_min': float or array, [opt.] minimum allowed value for independent variable
+        - 'x_max': float or array, [opt.] maximum allowed value for independent variable
+        - 'y_t': float or array, output variable target
+        - 'trend': bool or array, default=None, function trend, monotonic increasing (True) or decreasing (False).
+                    If None, the trend is assessed automatically for each point.
+        - 'count_max': int, maximum number of iterations
+        - 'DEBUG': bool, enables debugging printouts
+        - 'printout': print final result
+    - function: vectorized function on which the convergence value must be reached. It is called
+            once per iteration with the arrays of the points not yet converged:
+        - f(x) = y : single variable function, x and y arrays
+        - f(x1, x2, x3, ...) = y : multiple variables function, all the inputs are arrays
+    - args: additional function inputs (float or array), they are not varied inside the convergence.
+    'x_0', 'y_t', 'delta' and args are broadcast to a common shape, i.e. the number of points.
+    Return
+    - x: array, independent variable of each point
+    - y: array, output variable of each point
+    - count: array[int], number of iterations of each point
+    - conv: array[bool], convergence flag of each point
     """
     tol = settings.get('tol')
-    delta = settings.get('delta')
     delta_scaler = settings.get('delta_scaler', 2)
-    x_name = settings.get('x_name')
-    x = settings.get('x_0') # independent variable initialization
     x_min = settings.get('x_min')
     x_max = settings.get('x_max')
-    y_t_name = settings.get('y_t_name')
-    y_t = settings.get('y_t')
-    trend = settings.get('trend', None) 
+    trend = settings.get('trend', None)
     count_max = settings.get('count_max')
     DEBUG = settings.get('DEBUG', False)
     printout = settings.get('printout', False)
 
-    def function_wrapper(function, inp_dict, x, x_name, y_t_name):
-        inp_dict[x_name] = x
-        res = function(inp_dict)
-        y = res[y_t_name]
-        return y
-    
+    x_0 = np.asarray(settings.get('x_0'), dtype=float)
+    y_t = np.asarray(settings.get('y_t'), dtype=float)
+    delta = np.asarray(settings.get('delta'), dtype=float)
+    args = [np.asarray(arg) for arg in args]
+    shape = np.broadcast_shapes(x_0.shape, y_t.shape, delta.shape, *[arg.shape for arg in args])
+
+    "points flattened into 1D arrays, reshaped before returning"
+    x = np.broadcast_to(x_0, shape).flatten()
+    y_t = np.broadcast_to(y_t, shape).flatten()
+    delta = np.broadcast_to(delta, shape).flatten()
+    args = [np.broadcast_to(arg, shape).flatten() for arg in args]
+    if x_min is not None:
+        x_min = np.broadcast_to(np.asarray(x_min, dtype=float), shape).flatten()
+    if x_max is not None:
+        x_max = np.broadcast_to(np.asarray(x_max, dtype=float), shape).flatten()
+    n = x.size
+
+    def function_wrapper(function, x, idx):
+        y = function(x, *[arg[idx] for arg in args])
+        return np.broadcast_to(np.asarray(y, dtype=float), x.shape)
+
+    all_points = np.arange(n)
+    y = function_wrapper(function, x, all_points).copy()
+
     if trend is None:
         "assess the trend of the function"
-        y = function_wrapper(function, inp_dict, x, x_name, y_t_name)
-        y_up = function_wrapper(function, inp_dict, x + delta, x_name, y_t_name)
-        if y < y_up:
-            "Monotonic Increasing with x"
-            trend = True
-        elif y > y_up:
-            "Monotonic Decreasing with x"
-            trend = False
-        else:
-            print(f"warning: the funciton trend for the given x {x} cannot be assessed. A Monotonic Increasing trend is assumed.")
-            trend = True
-    
+        y_up = function_wrapper(function, x + delta, all_points)
+        flat = y == y_up
+        if flat.any():
+            print(f"warning: the funciton trend cannot be assessed for {flat.sum()} points. A Monotonic Increasing trend is assumed.")
+        trend = y <= y_up
+    else:
+        trend = np.broadcast_to(np.asarray(trend, dtype=bool), shape).flatten()
 
     "initialization"
-    inc = 1
-    conv = False
-    count = 1
+    inc = np.ones(n)
+    count = np.ones(n, dtype=int)
+    conv = np.abs(y - y_t) <= tol
+    active = ~conv
+    if count_max:
+        active &= count < count_max
 
-    inp_dict[x_name] = x
-    res = function(inp_dict)
-    y = res[y_t_name]
-
-    y = function_wrapper(function, inp_dict, x, x_name, y_t_name)
-    
-    while True:
+    while active.any():
+        idx = np.flatnonzero(active)
         if DEBUG:
-            print(f"{count} err: {abs(y - y_t):.4f} - x = {x:.4f} - y = {y:.4f} - y_t = {y_t:.4f}")
-        if abs(y - y_t) <= tol:
-            conv = True
-            break
+            err = np.abs(y[idx] - y_t[idx])
+            print(f"{count[idx].max()} active: {idx.size} - max err: {err.max():.4f}")
+        count[idx] += 1
 
-        count += 1
-        if trend is True:
-            "Monotonic Increasing with x"
-            if y > y_t + tol:
-                if inc == 1:
-                    inc = -1
-                    delta /= delta_scaler
-                x -= delta
-            elif y < y_t - tol:
-                if inc == -1:
-                    inc = 1
-                    delta /= delta_scaler
-                x += delta
-        elif trend is False:
-            "Monotonic Decreasing with x"
-            if y < y_t - tol:
-                if inc == 1:
-                    inc = -1
-                    delta /= delta_scaler
-                x -= delta
-            elif y > y_t + tol:
-                if inc == -1:
-                    inc = 1
-                    delta /= delta_scaler
-                x += delta
-        
-        "x limits"
-        if x_min:
-            if x < x_min: x = x_min
-        if x_max:
-            if x > x_max: x = x_max
+        "step direction: +1 increases x, -1 decreases x"
+        step = np.where(y[idx] > y_t[idx], -1., 1.)
+        step = np.where(trend[idx], step, -step)
+        "the delta is scaled at each inversion of the direction"
+        delta[idx] = np.where(step != inc[idx], delta[idx] / delta_scaler, delta[idx])
+        inc[idx] = step
+        x_idx = x[idx] + step * delta[idx]
 
-        inp_dict[x_name] = x
-        res = function(inp_dict)
-        y = res[y_t_name]
+        "x limits"
+        if x_min is not None:
+            x_idx = np.maximum(x_idx, x_min[idx])
+        if x_max is not None:
+            x_idx = np.minimum(x_idx, x_max[idx])
+        x[idx] = x_idx
 
+        y[idx] = function_wrapper(function, x_idx, idx)
+        conv[idx] = np.abs(y[idx] - y_t[idx]) <= tol
+        active[idx] = ~conv[idx]
         if count_max:
-            if count >= count_max:
-                if DEBUG:
-                    print("Iteration count limit reached. Exit the loop.")
-                break
-    
+            active &= count < count_max
+
     if printout:
-        if conv:
-            print(f"Convergence reached!\n\tIterations: {count} - Error: {abs(y - y_t):.4f}\nx ({x_name}) = {x:.4f} - y ({y_t_name}) = {y:.4f} - y_t = {y_t:.4f}")
-        else:
-            print(f"Convergence not reached!\n\tIterations: {count} - Error: {abs(y - y_t):.4f}\nx ({x_name}) = {x:.4f} - y ({y_t_name}) = {y:.4f} - y_t = {y_t:.4f}")
-            
-    return inp_dict, res
\ No newline at end of file
+        err = np.abs(y - y_t)
+        print(f"Convergence reached for {conv.sum()}/{n} points!\n\tIterations: max {count.max()} - Error: max {err.max():.4f}")
+    return x.reshape(shape), y.reshape(shape), count.reshape(shape), conv.reshape(shape)
@@ -1,17 +1,24 @@
+from obj.utils import LazyModule
 from copy import deepcopy
+from itertools import chain, islice
+import tempfile
+import csv
+import sys
 import os
 
+"numpy is used only by the columnar tables: loaded at the first use"
+np = LazyModule('numpy')
+
 def _to_str(headers:list[any], records:list[list[any]]) -> tuple[list[str], list[list[str]]]:
     """
     Convert the content of the provided lists to string.
-    Input lists are copied to avoid issues due to list mutability.
+    New lists are returned, the input lists are not modified.
     - headers: list[any], list of the table headers
     - records: list[list[any]], list of the records (i.e. table content)
     Returns:
     - h_str: list[str]: 
     - r_str: list[list[str]]
     """
-    h_str, r_str = deepcopy(headers), deepcopy(records)
     h_str = [str(h) for h in headers]
     r_str = [[str(r) for r in rec] for rec in records]
     return h_str, r_str
@@ -83,22 +90,28 @@ def _build_table_horiz(headers:list[str], records:list[list[str]], settings:dict
     - s: str, the table
     """
     col_len = _calc_max_width_horiz(headers, records, spaces=settings["spaces"], width=settings["width"])
-    sep = settings["separator"]
-    template = sep
-    for i in range(len(headers)):
-        if i == 0:
-            template += "{:<%d}%s" % (col_len[i], sep)
-        else:
-            template += "{:^%d}%s" % (col_len[i], sep) 
-    template += "\n"
+    template = _template_horiz(col_len, settings["separator"])
     rows = [headers]
     if settings["markdown"]:
         rows += [["---" for _ in range(len(headers))]]
     rows += records
-    s = ""
-    for row in rows:
-        s += template.format(*row)
-    return s
+    return "".join([template.format(*row) for row in rows])
+
+def _template_horiz(col_len:list[int], sep:str) -> str:
+    """
+    Row template of the horizontal layout, first column left aligned, the others centered.
+    - col_len: list[int], the width of each column
+    - sep: str, separator character between two columns
+    Returns:
+    - template: str, format string of a row (new line included)
+    """
+    template = sep
+    for i in range(len(col_len)):
+        if i == 0:
+            template += "{:<%d}%s" % (col_len[i], sep)
+        else:
+            template += "{:^%d}%s" % (col_len[i], sep)
+    return template + "\n"
 
 def _build_table_vert(headers:list[str], records:list[list[str]], settings:dict) -> str:
     """
@@ -125,11 +138,7 @@ def _build_table_vert(headers:list[str], records:list[list[str]], settings:dict)
             rows[i].append(r)
     if settings["markdown"]:
         rows.insert(1, ["---" for _ in range(len(rows[0]))])
-
-    s = ""
-    for row in rows:
-        s += template.format(*row)
-    return s
+    return "".join([template.format(*row) for row in rows])
 
 def _import_settings(settings:dict) -> dict:
     """
@@ -147,6 +156,13 @@ def _import_settings(settings:dict) -> dict:
         - "folder"    : str, default="", folder of the exported file
         - "filename"  : str, default="table.txt"
         - "printout"  : bool, default=False, flag for the table printout
+        - "widths"    : list[int] | str, default="sample", column widths of the streamed tables (write_table)
+            - list[int]: fixed content width of each column, single pass
+            - "sample" : widths measured on the headers and the first "sample" records, single pass
+            - "spool"  : two passes, the records are spooled to a temporary file while measuring the widths
+        - "sample"    : int, default=1000, records measured with "widths"="sample"
+        - "chunk"     : int, default=1000, rows written at once by write_table
+        - "spool_size": int, default=2**24, bytes of the spooled records kept in memory before moving to disk
     Returns:
     - settings: dict, settings dictionary copied from the input one and properly modified
     """
@@ -164,6 +180,10 @@ def _import_settings(settings:dict) -> dict:
     settings["folder"] = settings.get("folder", "")
     settings["filename"] = settings.get("filename", "table.txt")
     settings["printout"] = settings.get("printout", False)
+    settings["widths"] = settings.get("widths", "sample")
+    settings["sample"] = settings.get("sample", 1000)
+    settings["chunk"] = settings.get("chunk", 1000)
+    settings["spool_size"] = settings.get("spool_size", 2**24)
 
     return settings
 
@@ -210,6 +230,209 @@ def print_table_horiz(headers:list[any], records:list[list[any]], settings:dict=
     settings["positioning"] = "horiz"
     print(build_table(headers, records, settings))
 
+def _str_records(records, n:int, start:int=0):
+    "Generator of the records converted to string, the size consistency with the n headers is checked."
+    for i, rec in enumerate(records, start):
+        rec = [str(r) for r in rec]
+        if len(rec) != n:
+            raise ValueError(f"Headers and Records {i} are not the same length: {n} != {len(rec)}")
+        yield rec
+
+def _stream_widths(headers:list[str], records, settings:dict) -> tuple:
+    """
+    Column content widths of a streamed table and the rows to be written.
+    - headers: list[str], list of the table headers
+    - records: iterable[list[any]], records (e.g. generator), consumed once
+    - settings: dict, settings dictionary
+    Returns:
+    - col_len: list[int], the content width of each column (spaces and user width excluded)
+    - rows: iterable[list[str]], the records converted to string
+    - spool: file, temporary file of the spooled records (None if not used), to be closed by the caller
+    """
+    n = len(headers)
+    widths = settings["widths"]
+    col_len = [len(h) for h in headers]
+    spool = None
+    if widths == "spool":
+        spool = tempfile.SpooledTemporaryFile(max_size=settings["spool_size"], mode="w+", newline="")
+        writer = csv.writer(spool)
+        for rec in _str_records(records, n):
+            for i, r in enumerate(rec):
+                if len(r) > col_len[i]:
+                    col_len[i] = len(r)
+            writer.writerow(rec)
+        spool.seek(0)
+        rows = csv.reader(spool)
+    elif widths == "sample":
+        records = iter(records)
+        sample = list(_str_records(islice(records, settings["sample"]), n))
+        for rec in sample:
+            for i, r in enumerate(rec):
+                if len(r) > col_len[i]:
+                    col_len[i] = len(r)
+        rows = chain(sample, _str_records(records, n, len(sample)))
+    else:
+        if len(widths) != n:
+            raise ValueError(f"Headers and widths are not the same length: {n} != {len(widths)}")
+        col_len = [int(w) for w in widths]
+        rows = _str_records(records, n)
+    return col_len, rows, spool
+
+def write_table(headers:list[any], records, settings:dict={}, file=None) -> int:
+    """
+    Streaming table writer, horizontal layout (plain or markdown): the records are consumed once and
+    written in buffered chunks with constant memory (the whole table is never built as string).
+    - headers: list[any], list of the table headers
+    - records: iterable[list[any]], records (e.g. generator of sweep results)
+    - settings: dict, default={}, settings dictionary (see _import_settings: "widths", "sample", "chunk", "spool_size")
+    - file: str | file, default=None, output file path or text stream, if None the exported file
+            (settings "export", "folder", "filename") or the standard output
+    Returns:
+    - count: int, number of records written
+    With "widths" given or "sample", cells longer than the column width are written in full (not aligned).
+    """
+    settings = _import_settings(settings)
+    if settings["positioning"] != "horiz":
+        raise ValueError("Streaming available for the horizontal layout only, the vertical one needs all the records")
+    headers = [str(h) for h in headers]
+    col_len, rows, spool = _stream_widths(headers, records, settings)
+    width = settings["width"] if settings["width"] is not None else 0
+    col_len = [max(l, width) + settings["spaces"] for l in col_len]
+    template = _template_horiz(col_len, settings["separator"])
+
+    if file is None and settings["export"]:
+        file = os.path.join(settings["folder"], settings["filename"])
+    f = open(file, "w") if isinstance(file, str) else (sys.stdout if file is None else file)
+    count = 0
+    try:
+        f.write(template.format(*headers))
+        if settings["markdown"]:
+            f.write(template.format(*["---" for _ in headers]))
+        chunk = []
+        for row in rows:
+            chunk.append(template.format(*row))
+            if len(chunk) >= settings["chunk"]:
+                f.write("".join(chunk))
+                count += len(chunk)
+                chunk = []
+        f.write("".join(chunk))
+        count += len(chunk)
+    finally:
+        if isinstance(file, str):
+            f.close()
+        if spool is not None:
+            spool.close()
+    return count
+
+def _columns_input(columns, headers:list[any]=None) -> tuple[list[str], list]:
+    """
+    Headers and column arrays of a columnar table (no copy of the numeric data).
+    - columns: dict[str, array] | 2D ndarray | structured ndarray, table content by columns
+    - headers: list[any], default=None, headers of a 2D ndarray (column indexes if None), ignored otherwise
+    Returns:
+    - headers: list[str]
+    - cols: list[ndarray], 1D arrays of the same length
+    """
+    if isinstance(columns, dict):
+        headers = [str(h) for h in columns]
+        cols = [np.asarray(c) for c in columns.values()]
+    elif isinstance(columns, np.ndarray) and columns.dtype.names is not None:
+        headers = list(columns.dtype.names)
+        cols = [columns[h] for h in headers]
+    else:
+        columns = np.asarray(columns)
+        if columns.ndim != 2:
+            raise ValueError(f"Columns must be a dict of arrays, a structured array or a 2D array: ndim={columns.ndim}")
+        headers = [str(h) for h in headers] if headers is not None else [str(i) for i in range(columns.shape[1])]
+        cols = [columns[:, i] for i in range(columns.shape[1])]
+    for h, c in zip(headers, cols):
+        if c.ndim != 1 or c.shape[0] != cols[0].shape[0]:
+            raise ValueError(f"Column '{h}' is not consistent with the first column: shape {c.shape} != {cols[0].shape}")
+    if len(headers) != len(cols):
+        raise ValueError(f"Headers and Columns are not the same length: {len(headers)} != {len(cols)}")
+    return headers, cols
+
+def _format_column(col, spec:str=None) -> list[str]:
+    """
+    String conversion of a column, one pass over the Python values (format() and str() are the fastest conversions,
+    the numpy string functions are slower on fixed width strings).
+    - col: ndarray, 1D column
+    - spec: str, default=None, format() spec of the column (e.g. ".3f", ".2e", ",d"), str() conversion if None
+    Returns:
+    - col_str: list[str]
+    """
+    if col.dtype.kind in "USO" or (spec is None and not (col.dtype.kind in "iub" or col.dtype == np.float64)):
+        "str of the numpy values (e.g. float32 shortest repr), strings and objects as they are"
+        return col.astype(str).tolist()
+    if spec is None:
+        return list(map(str, col.tolist()))
+    return list(map(("{:" + spec + "}").format, col.tolist()))
+
+def _format_columns(cols:list, headers:list[str], formats=None) -> list:
+    "String conversion of all the columns, formats: dict {header: spec} or list of specs (None for default)."
+    if formats is None:
+        formats = [None] * len(cols)
+    elif isinstance(formats, dict):
+        formats = [formats.get(h) for h in headers]
+    return [_format_column(c, f) for c, f in zip(cols, formats)]
+
+def _build_table_columns_horiz(headers:list[str], cols:list, settings:dict) -> str:
+    """
+    Build the table as string from string columns, horizontal layout (one row template mapped over the columns):
+    - headers: list[str], list of the table headers
+    - cols: list[list[str]], columns of the table
+    - settings: dict, settings dictionary
+    Returns:
+    - s: str, the table
+    """
+    width = settings["width"] if settings["width"] is not None else 0
+    col_len = [max(len(h), max(map(len, c), default=0), width) + settings["spaces"] for h, c in zip(headers, cols)]
+    sep = settings["separator"]
+    template = _template_horiz(col_len, sep)
+    s = template.format(*headers)
+    if settings["markdown"]:
+        s += template.format(*["---" for _ in headers])
+    if len(cols) == 0:
+        return s
+    return s + "".join(map(template.format, *cols))
+
+def _build_table_columns_vert(headers:list[str], cols:list, settings:dict) -> str:
+    """
+    Build the table as string from string columns, vertical layout (the columns become rows):
+    - headers: list[str], list of the table headers
+    - cols: list[list[str]], columns of the table
+    - settings: dict, settings dictionary
+    Returns:
+    - s: str, the table formatted as string
+    """
+    width = settings["width"] if settings["width"] is not None else 0
+    sep = settings["separator"]
+    h_len = max([len(h) for h in headers] + [width]) + settings["spaces"]
+    rec_len = [max(max(lens), width) + settings["spaces"] for lens in zip(*[map(len, c) for c in cols])]
+    template = "".join(["{:^%d}%s" % (l, sep) for l in rec_len]) # record cells of a row
+    rows = [sep + f"{h:<{h_len}}" + sep + template.format(*c) + "\n" for h, c in zip(headers, cols)]
+    if settings["markdown"]:
+        rows.insert(1, sep + f"{'---':<{h_len}}" + sep + template.format(*["---"] * len(rec_len)) + "\n")
+    return "".join(rows)
+
+def build_table_columns(columns, settings:dict={}, headers:list[any]=None, formats=None) -> str:
+    """
+    Columnar table: each column is formatted in one pass, the rows are built by a single template, no record lists.
+    - columns: dict[str, array] | 2D ndarray | structured ndarray, table content by columns
+    - settings: dict, default={}, settings dictionary
+    - headers: list[any], default=None, headers of a 2D ndarray (column indexes if None)
+    - formats: dict[str, str] | list[str], default=None, format() spec of each column (e.g. {"p": ".2f", "h": ".4e"}),
+               str() conversion for the columns without spec (strings columns are not formatted)
+    Return:
+    - table: str, the table formatted as string
+    """
+    settings = _import_settings(settings)
+    headers, cols = _columns_input(columns, headers)
+    cols = _format_columns(cols, headers, formats)
+    if settings["positioning"] == "vert":
+        return _build_table_columns_vert(headers, cols, settings)
+    return _build_table_columns_horiz(headers, cols, settings)
+
 class TablePrintout:
     def __init__(self, headers:list[any], records:list[list[any]], settings:dict):
         """
@@ -230,28 +453,164 @@ class TablePrintout:
         """
         self.settings = _import_settings(settings)
         self.headers, self.records = _to_str(headers, records)
+        self.columns = None
+        _check_consistency(self.headers, self.records)
+        self._widths = [len(h) for h in self.headers]
+        self._update_widths(self.records)
+        self._init_output()
+
+    def _init_output(self):
+        self._printed = None # (records, column widths) of the last printout
+        self._exported = None # (filepath, column widths, records, file size) of the last export
+        self._table = None
         self.build_table()
         if self.settings["printout"] is True:
             self.print_table()
         if self.settings["export"] is True:
             self.export()
 
+    @classmethod
+    def from_columns(cls, columns, settings:dict={}, headers:list[any]=None, formats=None):
+        """
+        Columnar table, formatted once and vectorized by column (see build_table_columns).
+        - columns: dict[str, array] | 2D ndarray | structured ndarray, table content by columns
+        - settings: dict, default={}, parameters that defines the table built (see __init__)
+        - headers: list[any], default=None, headers of a 2D ndarray (column indexes if None)
+        - formats: dict[str, str] | list[str], default=None, format() spec of each column (e.g. {"p": ".2f"})
+        The string columns are stored into .columns (.records is None).
+        """
+        self = cls.__new__(cls)
+        self.settings = _import_settings(settings)
+        self.headers, cols = _columns_input(columns, headers)
+        self.columns = _format_columns(cols, self.headers, formats)
+        self.records = None
+        self._widths = [max(len(h), max(map(len, c), default=0)) for h, c in zip(self.headers, self.columns)]
+        self._init_output()
+        return self
+
+    def _update_widths(self, records:list[list[str]]) -> bool:
+        "Content widths updated with the given string records, True if a column grows."
+        grown = False
+        for rec in records:
+            for i, r in enumerate(rec):
+                if len(r) > self._widths[i]:
+                    self._widths[i] = len(r)
+                    grown = True
+        return grown
+
+    def _col_len(self) -> list[int]:
+        "Column widths of the horizontal layout (spaces and user width included)."
+        width = self.settings["width"] if self.settings["width"] is not None else 0
+        return [max(w, width) + self.settings["spaces"] for w in self._widths]
+
+    def _rows(self, start:int, col_len:list[int]) -> str:
+        "Horizontal layout rows of the records from start (headers included if start is 0)."
+        template = _template_horiz(col_len, self.settings["separator"])
+        rows = []
+        if start == 0:
+            rows.append(template.format(*self.headers))
+            if self.settings["markdown"]:
+                rows.append(template.format(*["---" for _ in self.headers]))
+        rows += [template.format(*rec) for rec in self.records[start:]]
+        return "".join(rows)
+
+    def _incremental(self, state) -> bool:
+        "True if only the records appended after the given output state can be rendered."
+        return (state is not None and self.records is not None and self.settings["positioning"] == "horiz"
+                and state[1] == self._col_len())
+
+    def append(self, record:list[any]):
+        """
+        Append a record: cells converted to string and column widths updated incrementally.
+        The table string is rebuilt only when needed (see print_new and export for the incremental outputs).
+        - record: list[any], new record
+        """
+        if self.records is None:
+            "columnar table: the string columns are moved to records once"
+            self.records = [list(rec) for rec in zip(*self.columns)]
+            self.columns = None
+        rec = [str(r) for r in record]
+        if len(rec) != len(self.headers):
+            raise ValueError(f"Headers and Records {len(self.records)} are not the same length: {len(self.headers)} != {len(rec)}")
+        self.records.append(rec)
+        self._update_widths([rec])
+        self.table = None
+
+    def extend(self, records:list[list[any]]):
+        """
+        Append multiple records, see append.
+        - records: list[list[any]], new records
+        """
+        for record in records:
+            self.append(record)
+
+    @property
+    def table(self) -> str:
+        "The table formatted as string, built on demand after the records appended."
+        if self._table is None:
+            self.build_table()
+        return self._table
+
+    @table.setter
+    def table(self, table:str):
+        self._table = table
+
     def build_table(self):
-        self.table = build_table(self.headers, self.records, self.settings)
+        if self.columns is not None:
+            build = _build_table_columns_vert if self.settings["positioning"] == "vert" else _build_table_columns_horiz
+            self.table = build(self.headers, self.columns, self.settings)
+        elif self.settings["positioning"] == "horiz":
+            self.table = self._rows(0, self._col_len()) # cached widths, no measure of the records
+        else:
+            self.table = build_table(self.headers, self.records, self.settings)
 
-    def print_table(self, settings={}):
+    def _set_settings(self, settings:dict):
         if len(settings) != 0:
             self.settings = _import_settings(settings)
-            self.table = self.build_table(self.headers, self.records, settings)
+            self.table = None
+            self._printed, self._exported = None, None # new layout: no incremental output
+
+    def _n_records(self) -> int:
+        return len(self.records) if self.records is not None else len(self.columns[0]) if self.columns else 0
+
+    def print_table(self, settings={}):
+        self._set_settings(settings)
         print(self.table)
+        self._printed = (self._n_records(), self._col_len())
+
+    def print_new(self) -> str:
+        """
+        Progress printout: only the records appended since the last printout are printed when the column
+        widths are unchanged, the whole table is reflowed when a column grows (or with the vertical layout).
+        Return
+        - s: str, printed string
+        """
+        if self._incremental(self._printed):
+            s = self._rows(self._printed[0], self._printed[1])
+            if s:
+                print(s, end='')
+            self._printed = (len(self.records), self._printed[1])
+            return s
+        self.print_table()
+        return self.table
 
     def export(self, settings={}):
-        if len(settings) != 0:
-            self.settings = _import_settings(settings)
-            self.table = self.build_table(self.headers, self.records, settings)
+        """
+        Export the table to the file of the settings ("folder", "filename").
+        When the same file was exported before with the same column widths (and not modified since), only the
+        records appended after it are written at the end of the file, otherwise the whole file is rewritten.
+        - settings: dict, default={}, new settings dictionary (the whole table is rewritten)
+        """
+        self._set_settings(settings)
         filepath = os.path.join(self.settings["folder"], self.settings["filename"])
+        tail = (self._incremental(self._exported) and self._exported[0] == filepath and os.path.exists(filepath)
+                and os.path.getsize(filepath) == self._exported[3])
         print(f"Exporting {filepath} ... ", end='')
-        with open(filepath, "w") as f:
-            f.write(self.table)
+        if tail:
+            with open(filepath, "a", newline="") as f:
+                f.write(self._rows(self._exported[2], self._exported[1]))
+        else:
+            with open(filepath, "w", newline="") as f:
+                f.write(self.table)
+        self._exported = (filepath, self._col_len(), self._n_records(), os.path.getsize(filepath))
         print("done!")
-        
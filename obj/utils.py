@@ -1,3 +1,113 @@
+import importlib
+
+class LazyModule:
+    def __init__(self, name:str):
+        """
+        Module imported at the first attribute access, e.g. np = LazyModule('numpy').
+        Heavy dependencies (CoolProp, matplotlib) are not loaded by the workers that never use them.
+        - name: str, full module name (e.g. 'matplotlib.pyplot')
+        """
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self):
+        if self._module is None:
+            self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule '{self._name}' ({state})>"
+
+"numpy is used only by curve_intersection: loaded at the first use"
+np = LazyModule('numpy')
+
+def _overlap_pairs(lo, hi, order, chunk:int):
+    """
+    Generator of the candidate pairs in memory-bounded blocks: for each row r the columns order[lo[r]:hi[r]].
+    - lo, hi: array[int], bounds of the columns of each row into order
+    - order: array[int], column indexes (sorted by interval start)
+    - chunk: int, maximum number of pairs of each block (a single row with more pairs is a block)
+    Yields
+    - rows, cols: array[int], pairs of the block
+    """
+    counts = np.maximum(hi - lo, 0)
+    cum = np.cumsum(counts)
+    n = counts.size
+    r0 = 0
+    while r0 < n:
+        done = cum[r0 - 1] if r0 > 0 else 0
+        r1 = max(int(np.searchsorted(cum, done + chunk, side='right')), r0 + 1)
+        rows = np.arange(r0, min(r1, n))
+        c = counts[rows]
+        total = int(c.sum())
+        if total > 0:
+            rows_rep = np.repeat(rows, c)
+            offsets = np.arange(total) - np.repeat(np.cumsum(c) - c, c)
+            yield rows_rep, order[np.repeat(lo[rows], c) + offsets]
+        r0 = r1
+
+def curve_intersection(x1, y1, x2, y2, chunk:int=2**20) -> tuple:
+    """
+    Intersection points of two polylines (e.g. compressor map against system curve).
+    The candidate segment pairs are found by sorting the segments on the x-extent (overlapping intervals),
+    processed in memory-bounded blocks, filtered on the y-extent and solved analytically (2x2 system).
+    Memory scales with the number of points plus the candidate pairs of a block.
+    - x1, y1: array-like, points of the first curve
+    - x2, y2: array-like, points of the second curve
+    - chunk: int, default=2**20, maximum number of candidate pairs processed at once
+    Return (sorted along the first curve)
+    - x, y: array, intersection points
+    - i, j: array[int], segment indexes of the first and second curve (segment i from point i to i+1)
+    Parallel (and collinear) segments are not intersected. A point shared by two consecutive segments is
+    reported once (for the first segment only at its end point if it is the last segment).
+    """
+    x1, y1, x2, y2 = [np.asarray(v, dtype=float).ravel() for v in (x1, y1, x2, y2)]
+    if x1.size != y1.size or x2.size != y2.size:
+        raise ValueError(f"x and y are not the same length: {x1.size} != {y1.size} or {x2.size} != {y2.size}")
+    n1, n2 = x1.size - 1, x2.size - 1
+    empty = (np.zeros(0), np.zeros(0), np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+    if n1 < 1 or n2 < 1:
+        return empty
+    a1, b1 = np.minimum(x1[:-1], x1[1:]), np.maximum(x1[:-1], x1[1:])
+    a2, b2 = np.minimum(x2[:-1], x2[1:]), np.maximum(x2[:-1], x2[1:])
+    c1, d1 = np.minimum(y1[:-1], y1[1:]), np.maximum(y1[:-1], y1[1:])
+    c2, d2 = np.minimum(y2[:-1], y2[1:]), np.maximum(y2[:-1], y2[1:])
+    dx1, dy1, dx2, dy2 = np.diff(x1), np.diff(y1), np.diff(x2), np.diff(y2)
+
+    "overlapping x-intervals: start of segment 2 inside segment 1, or start of segment 1 inside segment 2 (strictly after)"
+    order2 = np.argsort(a2, kind='stable')
+    order1 = np.argsort(a1, kind='stable')
+    blocks = [(False, _overlap_pairs(np.searchsorted(a2[order2], a1, 'left'), np.searchsorted(a2[order2], b1, 'right'), order2, chunk)),
+              (True, _overlap_pairs(np.searchsorted(a1[order1], a2, 'right'), np.searchsorted(a1[order1], b2, 'right'), order1, chunk))]
+    res_i, res_j, res_t, res_u = [], [], [], []
+    for swap, pairs in blocks:
+        for rows, cols in pairs:
+            i, j = (cols, rows) if swap else (rows, cols)
+            keep = (c1[i] <= d2[j]) & (c2[j] <= d1[i])
+            i, j = i[keep], j[keep]
+            "p1 + t*r = p2 + u*s, solved by cross products"
+            den = dx1[i] * dy2[j] - dy1[i] * dx2[j]
+            qx, qy = x2[j] - x1[i], y2[j] - y1[i]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                t = (qx * dy2[j] - qy * dx2[j]) / den
+                u = (qx * dy1[i] - qy * dx1[i]) / den
+            ok = (den != 0) & (t >= 0) & (u >= 0) & ((t < 1) | ((t == 1) & (i == n1 - 1))) & ((u < 1) | ((u == 1) & (j == n2 - 1)))
+            res_i.append(i[ok]); res_j.append(j[ok]); res_t.append(t[ok]); res_u.append(u[ok])
+    if not res_i:
+        return empty
+    i, j, t = np.concatenate(res_i), np.concatenate(res_j), np.concatenate(res_t)
+    order = np.lexsort((t, i))
+    i, j, t = i[order], j[order], t[order]
+    return x1[i] + t * dx1[i], y1[i] + t * dy1[i], i, j
+
+
 def print_table(values:list, cols:int, col_width:int=20, title:str="") -> str:
     """
     Given a list of elements they are printed in a table format